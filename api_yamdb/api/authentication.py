@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import TokenUser, User
+
+VERSION_CLAIM = 'ver'
+# Версии токенов должны лежать в общем для всех воркеров кеше: в кеше
+# одного процесса остальные узнали бы об отзыве только через TIMEOUT.
+# Это проверяет check --deploy (api.checks).
+TOKEN_VERSION_SETTINGS = {
+    'CACHE': 'default',
+    'TIMEOUT': 300,
+    **getattr(settings, 'TOKEN_VERSIONS', {}),
+}
+# Версия для удалённых и неактивных пользователей: не совпадёт ни с одной.
+REVOKED = -1
+
+
+def token_version_key(user_id):
+    return f'auth-token-version:{user_id}'
+
+
+def get_cache():
+    return caches[TOKEN_VERSION_SETTINGS['CACHE']]
+
+
+def get_token_version(user_id):
+    """Актуальная версия токенов пользователя: из кеша, иначе из базы."""
+    cache = get_cache()
+    key = token_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        row = User.objects.filter(pk=user_id).values_list(
+            'token_version', 'is_active'
+        ).first()
+        version = row[0] if row and row[1] else REVOKED
+        # add, а не set: не затираем версию, записанную при сохранении.
+        cache.add(key, version, TOKEN_VERSION_SETTINGS['TIMEOUT'])
+    return version
+
+
+def store_token_version(user_id, version):
+    transaction.on_commit(lambda: get_cache().set(
+        token_version_key(user_id), version,
+        TOKEN_VERSION_SETTINGS['TIMEOUT']
+    ))
+
+
+def get_access_token(user):
+    """Access-токен с claims, которых хватает для проверки прав."""
+    token = AccessToken.for_user(user)
+    for field, value in user.get_token_claims().items():
+        token[field] = value
+    token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+def get_full_user(user):
+    """Полный профиль вместо пользователя, восстановленного из токена."""
+    if isinstance(user, TokenUser):
+        return User.objects.get(pk=user.pk)
+    return user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без загрузки пользователя из базы.
+
+    Роль и флаги берутся из claims токена, а отзыв проверяется по версии
+    токенов в кеше. Токены без claims обрабатываются как раньше.
+    """
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if validated_token[VERSION_CLAIM] != get_token_version(user_id):
+            raise AuthenticationFailed('Токен отозван.', code='token_revoked')
+        user = TokenUser(
+            id=user_id,
+            **{
+                field: validated_token[field]
+                for field in User.TOKEN_CLAIM_FIELDS
+            }
+        )
+        user._state.adding = False
+        return user
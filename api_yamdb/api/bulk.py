@@ -0,0 +1,264 @@
+"""Пакетное создание и удаление отзывов и комментариев.
+
+Ответ содержит результат для каждого элемента запроса в том же порядке.
+Проверки выполняются общими запросами для всей пачки, вставка - одним
+bulk_create. Элементы с ошибками пропускаются, остальные сохраняются одной
+транзакцией. Сигналы post_save при bulk_create не отправляются, поэтому
+счётчики, поисковый индекс и версии кеша обновляются здесь же.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from reviews.models import Comment, Review, Title
+from reviews.search import index_new_objects
+from .cache import bump_versions, invalidate
+from .serializers import (
+    DUPLICATE_REVIEW, BulkCommentSerializer, BulkReviewSerializer,
+    CommentSerializer, ReviewSerializer
+)
+
+BULK_SETTINGS = {
+    'MAX_ITEMS': 100,
+    **getattr(settings, 'BULK_WRITE', {}),
+}
+
+NOT_FOUND = 'Не найдено.'
+FORBIDDEN = 'У вас недостаточно прав для выполнения данного действия.'
+
+
+def check_size(items):
+    if not isinstance(items, list) or not items:
+        raise ValidationError(
+            {'non_field_errors': ['Ожидается непустой массив.']}
+        )
+    if len(items) > BULK_SETTINGS['MAX_ITEMS']:
+        raise ValidationError({'non_field_errors': [
+            f'Не больше {BULK_SETTINGS["MAX_ITEMS"]} элементов за запрос.'
+        ]})
+
+
+def failure(code, errors):
+    return {'status': code, 'errors': errors}
+
+
+def overall_status(results, success, response=None):
+    """Общий статус ответа по статусам элементов.
+
+    Если у всех элементов статус success, возвращает response (по умолчанию
+    тот же success), иначе 207 Multi-Status.
+    """
+    if all(result['status'] == success for result in results):
+        return response or success
+    return status.HTTP_207_MULTI_STATUS
+
+
+def validate_items(serializer_class, items):
+    """Проверяет поля элементов; возвращает {индекс: данные} и результаты."""
+    check_size(items)
+    valid = {}
+    results = [None] * len(items)
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            results[index] = failure(
+                status.HTTP_400_BAD_REQUEST, serializer.errors
+            )
+    return valid, results
+
+
+def save_reviews(user, reviews):
+    with transaction.atomic():
+        Review.objects.bulk_create(reviews)
+        if reviews[0].pk is None:
+            # Бэкенд не вернул ключи: отзыв однозначно находится по паре
+            # (автор, произведение).
+            ids = dict(Review.objects.filter(
+                author_id=user.pk,
+                title_id__in=[review.title_id for review in reviews],
+            ).values_list('title_id', 'pk'))
+            for review in reviews:
+                review.pk = ids[review.title_id]
+        Title.objects.change_ratings({
+            review.title_id: {review.score: 1} for review in reviews
+        })
+        index_new_objects(reviews)
+        bump_versions(*(('reviews', review.title_id) for review in reviews))
+        invalidate('titles')
+
+
+def insert_reviews(user, new, results, duplicate):
+    """Записывает отзывы {индекс: отзыв}, отсечённые ограничением убирает."""
+    if not new:
+        return
+    try:
+        save_reviews(user, list(new.values()))
+    except IntegrityError:
+        # Параллельный запрос успел оставить отзыв на одно из произведений:
+        # его отсекло ограничение unique_author_title, остальные отзывы
+        # записываем повторно.
+        taken = reviewed_titles(
+            user, [review.title_id for review in new.values()]
+        )
+        for index, review in list(new.items()):
+            if review.title_id in taken:
+                results[index] = duplicate
+                del new[index]
+        if new:
+            save_reviews(user, list(new.values()))
+
+
+def reviewed_titles(user, title_ids):
+    """Произведения, на которые у пользователя уже есть отзыв."""
+    return set(Review.objects.filter(
+        author_id=user.pk, title_id__in=title_ids
+    ).values_list('title_id', flat=True))
+
+
+def create_reviews(user, items):
+    valid, results = validate_items(BulkReviewSerializer, items)
+    title_ids = {data['title'] for data in valid.values()}
+    existing = set(Title.objects.filter(
+        pk__in=title_ids
+    ).values_list('pk', flat=True))
+    # Одна проверка уникальности для всех пар (автор, произведение).
+    reviewed = reviewed_titles(user, existing)
+    duplicate = failure(
+        status.HTTP_400_BAD_REQUEST, {'non_field_errors': [DUPLICATE_REVIEW]}
+    )
+    new = {}
+    for index, data in valid.items():
+        if data['title'] not in existing:
+            results[index] = failure(
+                status.HTTP_404_NOT_FOUND, {'title': [NOT_FOUND]}
+            )
+        elif data['title'] in reviewed:
+            results[index] = duplicate
+        else:
+            reviewed.add(data['title'])
+            new[index] = Review(
+                author=user, title_id=data['title'], text=data['text'],
+                score=data['score'],
+            )
+    insert_reviews(user, new, results, duplicate)
+    for index, review in new.items():
+        results[index] = {
+            'status': status.HTTP_201_CREATED,
+            'data': ReviewSerializer(review).data,
+        }
+    return results
+
+
+def create_comments(user, items):
+    valid, results = validate_items(BulkCommentSerializer, items)
+    parents = Review.objects.only('id', 'title_id').in_bulk(
+        {data['review'] for data in valid.values()}
+    )
+    new = {}
+    for index, data in valid.items():
+        review = parents.get(data['review'])
+        if review is None:
+            results[index] = failure(
+                status.HTTP_404_NOT_FOUND, {'review': [NOT_FOUND]}
+            )
+        else:
+            new[index] = Comment(author=user, review=review, text=data['text'])
+    comments = list(new.values())
+    if comments:
+        with transaction.atomic():
+            Comment.objects.bulk_create(comments)
+            if not connection.features.can_return_rows_from_bulk_insert:
+                # Строки одной вставки получают ключи по возрастанию в
+                # порядке пачки, и внутри транзакции последние строки автора
+                # - только что вставленные.
+                ids = list(Comment.objects.filter(author_id=user.pk).order_by(
+                    '-pk'
+                ).values_list('pk', flat=True)[:len(comments)])
+                for comment, pk in zip(comments, reversed(ids)):
+                    comment.pk = pk
+            Review.objects.change_comments_counts(
+                Counter(comment.review_id for comment in comments)
+            )
+            index_new_objects(comments)
+            # Отзывы отдают comments_count, поэтому меняются и их версии.
+            bump_versions(*(
+                scope for comment in comments for scope in (
+                    ('comments', comment.review_id),
+                    ('reviews', comment.review.title_id),
+                )
+            ))
+    for index, comment in new.items():
+        results[index] = {
+            'status': status.HTTP_201_CREATED,
+            'data': CommentSerializer(comment).data,
+        }
+    return results
+
+
+def split_deletable(user, ids, found):
+    """Результаты удаления и объекты, которые пользователь может удалить."""
+    results = []
+    allowed = []
+    for pk in ids:
+        obj = found.get(pk)
+        if obj is None:
+            results.append({'id': pk, **failure(
+                status.HTTP_404_NOT_FOUND, {'detail': NOT_FOUND}
+            )})
+        elif not (user.is_admin or user.is_moderator
+                  or obj.author_id == user.pk):
+            results.append({'id': pk, **failure(
+                status.HTTP_403_FORBIDDEN, {'detail': FORBIDDEN}
+            )})
+        else:
+            allowed.append(obj)
+            results.append({'id': pk, 'status': status.HTTP_204_NO_CONTENT})
+    return results, allowed
+
+
+def delete_reviews(user, ids):
+    check_size(ids)
+    found = Review.objects.only('id', 'author_id').in_bulk(ids)
+    results, allowed = split_deletable(user, ids, found)
+    if allowed:
+        with transaction.atomic():
+            # Права проверены по строкам, прочитанным до транзакции, а
+            # оценки перечитываются под блокировкой: параллельный PATCH или
+            # DELETE мог их изменить.
+            locked = Review.objects.select_for_update().filter(
+                pk__in=[review.pk for review in allowed]
+            ).values_list('pk', 'title_id', 'score')
+            removed = defaultdict(Counter)
+            pks = []
+            for pk, title_id, score in locked:
+                removed[title_id][score] -= 1
+                pks.append(pk)
+            Title.objects.change_ratings(removed)
+            Review.objects.filter(pk__in=pks).delete()
+    return results
+
+
+def delete_comments(user, ids):
+    check_size(ids)
+    found = Comment.objects.select_related('review').only(
+        'id', 'author_id', 'review_id', 'review__title_id'
+    ).in_bulk(ids)
+    results, allowed = split_deletable(user, ids, found)
+    if allowed:
+        with transaction.atomic():
+            removed = Counter(comment.review_id for comment in allowed)
+            Review.objects.change_comments_counts({
+                review_id: -count for review_id, count in removed.items()
+            })
+            Comment.objects.filter(
+                pk__in=[comment.pk for comment in allowed]
+            ).delete()
+            bump_versions(*(
+                ('reviews', comment.review.title_id) for comment in allowed
+            ))
+    return results
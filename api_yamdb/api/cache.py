@@ -0,0 +1,205 @@
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import urlencode
+from rest_framework.response import Response
+
+from reviews.db import PRIMARY, REPLICA_SETTINGS, replica_reads
+from reviews.models import DataVersion
+
+CACHE_SETTINGS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'KEY_PREFIX': 'api-response',
+    **getattr(settings, 'API_RESPONSE_CACHE', {}),
+}
+
+# Какие закешированные списки устаревают при изменении данных раздела:
+# список произведений содержит вложенные категории и жанры.
+DEPENDENT_NAMESPACES = {
+    'categories': ('categories', 'titles'),
+    'genres': ('genres', 'titles'),
+    'titles': ('titles',),
+}
+
+# Заголовки, от которых зависит ответ списка.
+VARY_HEADERS = ('HTTP_X_PAGINATION',)
+
+
+def get_cache():
+    return caches[CACHE_SETTINGS['ALIAS']]
+
+
+def make_key(*parts):
+    return ':'.join((CACHE_SETTINGS['KEY_PREFIX'], *map(str, parts)))
+
+
+def incr(key):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def new_version():
+    return uuid4().hex
+
+
+def replicated():
+    """Версии нужно копировать в базу, чтобы их видели реплики."""
+    return bool(REPLICA_SETTINGS['ALIASES'])
+
+
+def version_settled(version, *scope):
+    """Данные, прочитанные в текущем запросе, уже отражают версию.
+
+    Основная база всегда актуальна, а реплика догоняет её с задержкой:
+    ответ реплики можно кешировать и помечать ETag версии, только если её
+    собственная копия версии (DataVersion) совпадает с версией из кеша.
+    """
+    alias = replica_reads.get()
+    if alias is None:
+        return True
+    return DataVersion.objects.using(alias).filter(
+        key=make_key('version', *scope), version=version
+    ).exists()
+
+
+def load_version(key):
+    # Версия, вытесненная из кеша, восстанавливается из основной базы, иначе
+    # реплики не узнали бы новую случайную версию до следующего изменения.
+    if not replicated():
+        return new_version()
+    stored, _ = DataVersion.objects.using(PRIMARY).get_or_create(
+        key=key, defaults={'version': new_version()}
+    )
+    return stored.version
+
+
+def get_version(*scope):
+    """Текущая версия данных области, например ('reviews', title_id).
+
+    Версия случайная, а не счётчик: если ключ вытеснен из кеша, новая
+    версия не совпадёт ни с одной из выданных ранее.
+    """
+    key = make_key('version', *scope)
+    return get_cache().get_or_set(
+        key, lambda: load_version(key), timeout=None
+    )
+
+
+class VersionBump:
+    """Смена версий, накопленных за транзакцию; выполняется после коммита.
+
+    Копия версий записывается в базу одной пачкой до обновления кеша:
+    реплики применяют коммиты по порядку, поэтому реплика, получившая
+    копию, получила и данные. Пока кеш не обновлён, в нём старые версии,
+    которым реплика соответствует.
+    """
+
+    def __init__(self):
+        self.keys = set()
+
+    def __call__(self):
+        versions = {key: new_version() for key in self.keys}
+        if replicated():
+            rows = [
+                DataVersion(key=key, version=version)
+                for key, version in versions.items()
+            ]
+            with transaction.atomic(using=PRIMARY):
+                DataVersion.objects.bulk_create(rows, ignore_conflicts=True)
+                DataVersion.objects.bulk_update(rows, ('version',))
+        get_cache().set_many(versions, timeout=None)
+
+
+def pending_bump():
+    """Смена версий, уже запланированная в текущей транзакции."""
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return None
+    for _, callback in connection.run_on_commit:
+        if isinstance(callback, VersionBump):
+            return callback
+    return None
+
+
+def bump_versions(*scopes):
+    """Меняет версии областей после коммита текущей транзакции.
+
+    Кеш обновляется после коммита, чтобы конкурентный запрос не успел
+    закешировать данные из ещё не завершённой транзакции. Области всех
+    вызовов за транзакцию собираются в одну смену версий: каскадное
+    удаление, вызывающее сигналы для каждой строки, меняет каждую версию
+    один раз.
+    """
+    keys = {make_key('version', *scope) for scope in scopes}
+    bump = pending_bump()
+    if bump is not None:
+        bump.keys |= keys
+        return
+    bump = VersionBump()
+    bump.keys |= keys
+    transaction.on_commit(bump)
+
+
+def invalidate(namespace):
+    """Сбрасывает закешированные списки раздела и зависящих от него."""
+    bump_versions(*(
+        (dependent,) for dependent in DEPENDENT_NAMESPACES[namespace]
+    ))
+
+
+def request_fingerprint(request):
+    """Хеш всего, от чего зависят данные ответа на GET-запрос."""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    vary = [request.META.get(header, '') for header in VARY_HEADERS]
+    raw = '|'.join((request.get_host(), request.path, query, *vary))
+    return md5(raw.encode('utf-8')).hexdigest()
+
+
+def request_key(namespace, version, request):
+    return make_key(
+        'list', namespace, version, request_fingerprint(request)
+    )
+
+
+def get_stats():
+    cache = get_cache()
+    stats = {}
+    for namespace in DEPENDENT_NAMESPACES:
+        keys = {
+            counter: make_key('stats', namespace, counter)
+            for counter in ('hits', 'misses')
+        }
+        values = cache.get_many(keys.values())
+        stats[namespace] = {
+            counter: values.get(key, 0) for counter, key in keys.items()
+        }
+    return stats
+
+
+class CachedListMixin:
+    """Кеширует данные ответа списка до изменения данных раздела."""
+
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        cache = get_cache()
+        version = get_version(self.cache_namespace)
+        key = request_key(self.cache_namespace, version, request)
+        data = cache.get(key)
+        if data is not None:
+            incr(make_key('stats', self.cache_namespace, 'hits'))
+            return Response(data, headers={'X-Cache': 'HIT'})
+        incr(make_key('stats', self.cache_namespace, 'misses'))
+        response = super().list(request, *args, **kwargs)
+        if version_settled(version, self.cache_namespace):
+            cache.set(key, response.data, CACHE_SETTINGS['TIMEOUT'])
+        response['X-Cache'] = 'MISS'
+        return response
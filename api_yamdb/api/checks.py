@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from .authentication import TOKEN_VERSION_SETTINGS
+
+# Бэкенды, данные которых видит только один процесс.
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register(Tags.caches, deploy=True)
+def check_token_version_cache(app_configs, **kwargs):
+    """Отзыв токенов должен сразу действовать во всех воркерах."""
+    alias = TOKEN_VERSION_SETTINGS['CACHE']
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        f'Версии токенов хранятся в кеше {alias!r} в памяти процесса: '
+        'другие воркеры будут принимать отозванный токен до '
+        f'{TOKEN_VERSION_SETTINGS["TIMEOUT"]} секунд после отзыва.',
+        hint=(
+            'Задайте общий кеш (Redis, Memcached, база данных) через '
+            'CACHE_BACKEND или TOKEN_VERSION_CACHE.'
+        ),
+        id='api.E001',
+    )]
@@ -0,0 +1,79 @@
+from hashlib import md5
+
+from django.utils.cache import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import get_version, request_fingerprint, version_settled
+
+
+def strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+class ConditionalListMixin:
+    """ETag для списка и ответ 304 Not Modified без сериализации данных.
+
+    ETag строится из версии области данных (см. api.cache.get_version)
+    и дополнительных дешёвых значений из get_validator.
+    """
+
+    def get_version_scope(self):
+        """Область версий, изменение которой меняет ответы вьюсета."""
+        return (self.cache_namespace,)
+
+    def get_data_version(self):
+        if not hasattr(self, '_data_version'):
+            self._data_version = get_version(*self.get_version_scope())
+        return self._data_version
+
+    def get_validator(self):
+        return [self.get_data_version()]
+
+    def get_etag(self, request):
+        raw = '|'.join(map(str, (
+            *self.get_validator(),
+            request_fingerprint(request),
+            request.META.get('HTTP_ACCEPT', ''),
+        )))
+        return f'W/"{md5(raw.encode("utf-8")).hexdigest()}"'
+
+    @staticmethod
+    def etag_matches(request, etag):
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if not header:
+            return False
+        etags = parse_etags(header)
+        return '*' in etags or any(
+            strip_weak(value) == strip_weak(etag) for value in etags
+        )
+
+    def conditional(self, handler, request, *args, **kwargs):
+        if not version_settled(
+            self.get_data_version(), *self.get_version_scope()
+        ):
+            # Реплика могла ещё не получить изменение: такой ответ не
+            # помечается ETag, иначе клиент закрепит устаревшие данные.
+            return handler(request, *args, **kwargs)
+        # ETag считается до чтения данных: если данные изменятся между
+        # этими шагами, клиент получит свежий ответ со старым ETag и
+        # просто скачает его ещё раз, а не застрянет на устаревшем.
+        etag = self.get_etag(request)
+        if self.etag_matches(request, etag):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag}
+            )
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+
+class ConditionalGetMixin(ConditionalListMixin):
+    """То же, что ConditionalListMixin, и для просмотра одного объекта."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
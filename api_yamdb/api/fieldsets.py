@@ -0,0 +1,107 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+class FieldsetSerializerMixin:
+    """Оставляет в ответе только поля из context['fieldset'], если он задан."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset')
+        if fieldset is None:
+            return fields
+        return {
+            name: field for name, field in fields.items() if name in fieldset
+        }
+
+
+class SparseFieldsetMixin:
+    """Выборочные поля ответа: ?fields=id,name или ?omit=description.
+
+    Запрос к базе сужается под выбранные поля: читаются только нужные
+    столбцы, а связанные объекты подгружаются, только если их поля есть
+    в ответе. Действует для GET-запросов, ответы на запись полные.
+    """
+
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+    # Поля модели, из которых строится поле ответа, если это не одноимённое
+    # поле модели: вычисляемые свойства и поля связанных объектов.
+    fieldset_sources = {}
+
+    def get_fieldset(self):
+        """Имена полей ответа или None, если нужен полный ответ."""
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = None
+            if self.request.method in SAFE_METHODS:
+                self._fieldset = self.parse_fieldset()
+        return self._fieldset
+
+    def parse_fieldset(self):
+        available = list(self.get_serializer_class()().fields)
+        selected = self.parse_names(self.fields_query_param, available)
+        omitted = self.parse_names(self.omit_query_param, available)
+        if selected is None and omitted is None:
+            return None
+        return [
+            name for name in available
+            if name in (selected or available) and name not in (omitted or ())
+        ]
+
+    def parse_names(self, param, available):
+        value = self.request.query_params.get(param)
+        if not value:
+            return None
+        names = [name for name in value.split(',') if name]
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError({param: [
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(available)}.'
+            ]})
+        return names
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None:
+            context['fieldset'] = self.get_fieldset()
+        return context
+
+    def filter_queryset(self, queryset):
+        # Сужается уже отфильтрованный и упорядоченный queryset, который
+        # читают и список, и get_object.
+        queryset = super().filter_queryset(queryset)
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+        return self.narrow_queryset(queryset, fieldset)
+
+    def narrow_queryset(self, queryset, fieldset):
+        meta = queryset.model._meta
+        # Поля сортировки нужны пагинации по курсору.
+        columns = {meta.pk.name} | {
+            field.lstrip('-')
+            for field in queryset.query.order_by or meta.ordering
+        } - {'pk'}
+        select, prefetch = set(), []
+        for name in fieldset:
+            sources = self.fieldset_sources.get(name, (name,))
+            try:
+                field = meta.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+            if field is not None and field.many_to_many:
+                prefetch.append(name)
+                continue
+            for source in sources:
+                columns.add(source)
+                relation = source.split(LOOKUP_SEP)[0]
+                if meta.get_field(relation).is_relation:
+                    select.add(relation)
+        queryset = queryset.select_related(None).prefetch_related(
+            None
+        ).only(*columns).prefetch_related(*prefetch)
+        # select_related() без аргументов подгрузил бы все связи.
+        return queryset.select_related(*select) if select else queryset
@@ -1,22 +1,62 @@
+from django.db.models import Q
 from django_filters import rest_framework as filters
 
 from reviews.models import Title
 
+SLUG_MATCH_CHOICES = (
+    ('exact', 'Точное совпадение slug'),
+    ('contains', 'Подстрока slug'),
+)
+
 
 class TitleFilter(filters.FilterSet):
-    category = filters.CharFilter(
-        field_name='category__slug',
-        lookup_expr='icontains'
-    )
-    genre = filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='icontains'
-    )
+    """Фильтр произведений.
+
+    По умолчанию category и genre сравниваются со slug точно, что
+    использует уникальные индексы slug; slug_match=contains возвращает
+    поиск по подстроке. В genre можно передать несколько slug через
+    запятую: подойдут произведения хотя бы с одним из жанров.
+    """
+
+    category = filters.CharFilter(method='filter_category')
+    genre = filters.CharFilter(method='filter_genre')
     name = filters.CharFilter(
         field_name='name',
         lookup_expr='icontains'
     )
+    slug_match = filters.ChoiceFilter(
+        choices=SLUG_MATCH_CHOICES, method='filter_slug_match'
+    )
 
     class Meta:
         model = Title
         fields = ('category', 'genre', 'name', 'year')
+
+    def slug_lookup(self):
+        if self.form.cleaned_data.get('slug_match') == 'contains':
+            return 'icontains'
+        return 'exact'
+
+    def filter_slug_match(self, queryset, name, value):
+        return queryset
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(
+            **{f'category__slug__{self.slug_lookup()}': value}
+        )
+
+    def filter_genre(self, queryset, name, value):
+        slugs = [slug for slug in value.split(',') if slug]
+        if not slugs:
+            return queryset
+        if self.slug_lookup() == 'exact':
+            condition = Q(genre__slug__in=slugs)
+        else:
+            condition = Q()
+            for slug in slugs:
+                condition |= Q(genre__slug__icontains=slug)
+        # Подзапрос по связующей таблице вместо JOIN: произведение с
+        # несколькими подходящими жанрами не попадает в выдачу дважды.
+        return queryset.filter(pk__in=Title.genre.through.objects.filter(
+            condition
+        ).values('title_id'))
@@ -0,0 +1,167 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from functools import reduce
+from operator import and_, or_
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по ключу сортировки с id для разрешения равенства.
+
+    Порядок берётся из order_by queryset, а без него - из Meta.ordering
+    модели.
+
+    Позиция хранится в курсоре как значения полей последнего объекта
+    страницы, поэтому любая страница стоит как первая: без COUNT(*) и OFFSET.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+        values, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.after(ordering, values))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    @staticmethod
+    def get_ordering(queryset):
+        meta = queryset.model._meta
+        ordering = list(queryset.query.order_by or meta.ordering)
+        if ordering[-1].lstrip('-') not in ('pk', meta.pk.name):
+            descending = ordering[0].startswith('-')
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def get_field(self, name):
+        name = name.lstrip('-')
+        if name == 'pk':
+            return self.model._meta.pk
+        return self.model._meta.get_field(name)
+
+    def after(self, ordering, values):
+        """Условие «строго после позиции» для заданного порядка полей."""
+        conditions = []
+        for position, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = [
+                Q(**{prev.lstrip('-'): values[index]})
+                for index, prev in enumerate(ordering[:position])
+            ]
+            strict = Q(**{f'{name}__{lookup}': values[position]})
+            conditions.append(reduce(and_, equal + [strict]))
+        return reduce(or_, conditions)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            raw_values, reverse = payload['v'], bool(payload['r'])
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+            values = [
+                self.get_field(field).to_python(value)
+                for field, value in zip(self.ordering, raw_values)
+            ]
+        except (BinasciiError, KeyError, TypeError, ValueError,
+                UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def encode_cursor(self, obj, reverse):
+        values = [
+            self.get_field(field).value_to_string(obj)
+            for field in self.ordering
+        ]
+        payload = json.dumps({'v': values, 'r': int(reverse)})
+        encoded = urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """Постраничная пагинация с включаемым по запросу режимом курсора.
+
+    Режим курсора включается параметром `?pagination=cursor`, заголовком
+    `X-Pagination: cursor` или наличием параметра `cursor` в запросе.
+    """
+
+    keyset_class = KeysetPagination
+    mode_query_param = 'pagination'
+    mode_header = 'HTTP_X_PAGINATION'
+    keyset_mode = 'cursor'
+
+    def keyset_requested(self, request):
+        return (
+            self.keyset_class.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param)
+            == self.keyset_mode
+            or request.META.get(self.mode_header) == self.keyset_mode
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_requested(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
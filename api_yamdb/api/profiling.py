@@ -0,0 +1,174 @@
+"""Профилирование запросов: время БД, сериализаторов и представления.
+
+Middleware выключена по умолчанию и включается настройкой
+API_PROFILING['ENABLED']. Время отдаётся в заголовке Server-Timing, а
+медленные запросы пишутся в лог одной JSON-строкой вместе с SQL, в котором
+одинаковые запросы свёрнуты в один с числом повторов.
+"""
+import json
+import logging
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+PROFILING_SETTINGS = {
+    'ENABLED': False,
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_QUERY_COUNT': 30,
+    # Сколько разных SQL-запросов, самых затратных, попадает в лог.
+    'LOGGED_QUERIES': 10,
+    'LOGGER': 'api.slow_requests',
+    **getattr(settings, 'API_PROFILING', {}),
+}
+
+current_profile = ContextVar('current_profile', default=None)
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+class Profile:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.timings = defaultdict(float)
+        self.queries = []
+        self.view_started = None
+        self._open = set()
+
+    @contextmanager
+    def section(self, name):
+        # Вложенный сериализатор уже учтён во внешнем.
+        if name in self._open:
+            yield
+            return
+        self._open.add(name)
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += perf_counter() - started
+            self._open.discard(name)
+
+    def record_query(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - started
+            self.timings['db'] += duration
+            self.queries.append((sql, duration))
+
+    def duplicates(self):
+        """SQL без параметров с числом повторов и суммарным временем."""
+        grouped = {}
+        for sql, duration in self.queries:
+            count, total = grouped.get(sql, (0, 0))
+            grouped[sql] = (count + 1, total + duration)
+        ordered = sorted(
+            grouped.items(), key=lambda item: item[1][1], reverse=True
+        )
+        return [
+            {'sql': sql, 'count': count, 'ms': milliseconds(total)}
+            for sql, (count, total) in ordered
+        ]
+
+    def server_timing(self, total):
+        parts = [
+            f'db;dur={milliseconds(self.timings["db"])};'
+            f'desc="{len(self.queries)} queries"',
+            f'serializer;dur={milliseconds(self.timings["serializer"])}',
+        ]
+        if 'view' in self.timings:
+            parts.append(f'view;dur={milliseconds(self.timings["view"])}')
+        parts.append(f'total;dur={milliseconds(total)}')
+        return ', '.join(parts)
+
+    def is_slow(self, total):
+        return (
+            total * 1000 >= PROFILING_SETTINGS['SLOW_REQUEST_MS']
+            or len(self.queries) >= PROFILING_SETTINGS['SLOW_QUERY_COUNT']
+        )
+
+    def report(self, request, response, total):
+        return {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'total_ms': milliseconds(total),
+            'view_ms': milliseconds(self.timings.get('view', 0)),
+            'serializer_ms': milliseconds(self.timings['serializer']),
+            'db_ms': milliseconds(self.timings['db']),
+            'queries': len(self.queries),
+            'sql': self.duplicates()[:PROFILING_SETTINGS['LOGGED_QUERIES']],
+        }
+
+
+def install_serializer_timing():
+    """Оборачивает BaseSerializer.data, чтобы мерить время сериализации.
+
+    Serializer.data и ListSerializer.data вызывают родительское свойство,
+    поэтому обёртки базового класса достаточно для всех сериализаторов.
+    """
+    original = BaseSerializer.data.fget
+    if getattr(original, 'profiled', False):
+        return
+
+    def data(self):
+        profile = current_profile.get()
+        if profile is None:
+            return original(self)
+        with profile.section('serializer'):
+            return original(self)
+
+    data.profiled = True
+    BaseSerializer.data = property(data)
+
+
+class ProfilingMiddleware:
+    """Заголовок Server-Timing и лог медленных запросов."""
+
+    def __init__(self, get_response):
+        if not PROFILING_SETTINGS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.logger = logging.getLogger(PROFILING_SETTINGS['LOGGER'])
+        install_serializer_timing()
+
+    def __call__(self, request):
+        profile = Profile()
+        token = current_profile.set(profile)
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(
+                            profile.record_query
+                        )
+                    )
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        finished = perf_counter()
+        total = finished - started
+        if profile.view_started is not None:
+            profile.timings['view'] = finished - profile.view_started
+        response['Server-Timing'] = profile.server_timing(total)
+        if profile.is_slow(total):
+            self.logger.warning(json.dumps(
+                profile.report(request, response, total), ensure_ascii=False
+            ))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = current_profile.get()
+        if profile is not None:
+            profile.view_started = perf_counter()
@@ -0,0 +1,60 @@
+"""Выбор базы для запроса: безопасные методы читают с реплик.
+
+После изменяющего запроса клиент в течение
+REPLICA_SETTINGS['STICKY_SECONDS'] читает с основной базы: так он сразу
+видит свой отзыв или комментарий, даже если реплика ещё не получила
+запись. Клиента узнают по токену из заголовка Authorization, а браузер без
+токена - по cookie.
+"""
+from hashlib import md5
+
+from django.core.exceptions import MiddlewareNotUsed
+
+from reviews.db import REPLICA_SETTINGS, read_from_replicas
+
+from .cache import get_cache, make_key
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def sticky_key(request):
+    """Ключ кеша, по которому запросы с тем же токеном читают с основной
+    базы, или None для запроса без токена."""
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    token = md5(authorization.encode('utf-8')).hexdigest()
+    return make_key('sticky', token)
+
+
+class ReplicaMiddleware:
+    """Чтение с реплик для GET, HEAD и OPTIONS без недавних записей."""
+
+    def __init__(self, get_response):
+        if not REPLICA_SETTINGS['ALIASES']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = sticky_key(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if response.status_code < 400:
+                self.stick(response, key)
+            return response
+        if REPLICA_SETTINGS['COOKIE'] in request.COOKIES or (
+            key is not None and get_cache().get(key)
+        ):
+            return self.get_response(request)
+        with read_from_replicas():
+            return self.get_response(request)
+
+    @staticmethod
+    def stick(response, key):
+        response.set_cookie(
+            REPLICA_SETTINGS['COOKIE'], '1',
+            max_age=REPLICA_SETTINGS['STICKY_SECONDS'],
+            httponly=True, samesite='Lax',
+        )
+        if key is not None:
+            get_cache().set(key, True, REPLICA_SETTINGS['STICKY_SECONDS'])
@@ -1,10 +1,49 @@
+from django.utils.encoding import smart_str
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 from reviews.constants import MAX_LENGTH_NAME, MAX_LENGTH_USER
 from reviews.models import (
-    Category, Comment, Genre, Review, Title, User
+    Category, Comment, Genre, Review, SearchKind, Title, User
 )
 from reviews.validators import validate_username, username_validator
+from .fieldsets import FieldsetSerializerMixin
+
+
+class ManySlugRelatedField(serializers.ManyRelatedField):
+    """Список слагов, который разрешается в объекты одним запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        slugs = [smart_str(item) for item in data]
+        found = {
+            getattr(obj, child.slug_field): obj
+            for obj in child.get_queryset().filter(
+                **{f'{child.slug_field}__in': slugs}
+            )
+        }
+        for slug in slugs:
+            if slug not in found:
+                child.fail(
+                    'does_not_exist', slug_name=child.slug_field, value=slug
+                )
+        return [found[slug] for slug in slugs]
+
+
+class BulkSlugRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField, у которого many=True не делает запрос на слаг."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ManySlugRelatedField(**list_kwargs)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -19,7 +58,8 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ('name', 'slug')
 
 
-class TitleResponseSerializer(serializers.ModelSerializer):
+class TitleResponseSerializer(FieldsetSerializerMixin,
+                              serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
     rating = serializers.IntegerField(default=0)
@@ -27,16 +67,36 @@ class TitleResponseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Title
         fields = (
-            'id', 'name', 'year', 'rating', 'description', 'genre', 'category'
+            'id', 'name', 'year', 'rating', 'reviews_count', 'description',
+            'genre', 'category'
         )
 
 
+class LeaderboardSerializer(TitleResponseSerializer):
+    """Произведение в рейтинге вместе со взвешенной оценкой."""
+
+    class Meta(TitleResponseSerializer.Meta):
+        fields = ('weighted_rating', *TitleResponseSerializer.Meta.fields)
+
+
+class TitleRatingSerializer(serializers.ModelSerializer):
+    """Средняя оценка произведения и распределение отзывов по оценкам."""
+
+    rating = serializers.FloatField(read_only=True)
+    scores = serializers.DictField(child=serializers.IntegerField(),
+                                   read_only=True)
+
+    class Meta:
+        model = Title
+        fields = ('id', 'rating', 'reviews_count', 'scores')
+
+
 class TitleSerializer(serializers.ModelSerializer):
     category = serializers.SlugRelatedField(
         slug_field='slug',
         queryset=Category.objects.all()
     )
-    genre = serializers.SlugRelatedField(
+    genre = BulkSlugRelatedField(
         slug_field='slug',
         queryset=Genre.objects.all(),
         many=True, allow_null=False, allow_empty=False
@@ -52,27 +112,23 @@ class TitleSerializer(serializers.ModelSerializer):
         return TitleResponseSerializer(instance).data
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+DUPLICATE_REVIEW = 'Пользователь может оставить только один отзыв'
+
+
+class ReviewSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         slug_field='username', read_only=True
     )
 
     class Meta:
         model = Review
-        fields = ('id', 'author', 'text', 'score', 'pub_date')
-
-    def validate(self, data):
-        if self.context['request']._request.method == 'POST':
-            user = self.context['request'].user
-            title_id = self.context['view'].kwargs['title_id']
-            if user.reviews.filter(title__id=title_id).exists():
-                raise serializers.ValidationError(
-                    'Пользователь может оставить только один отзыв'
-                )
-        return data
+        fields = (
+            'id', 'author', 'text', 'score', 'pub_date', 'comments_count'
+        )
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(FieldsetSerializerMixin,
+                        serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         slug_field='username', read_only=True
     )
@@ -83,6 +139,39 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ('review',)
 
 
+class BulkReviewSerializer(serializers.ModelSerializer):
+    """Элемент пакетного создания отзывов: произведение задаётся id."""
+
+    title = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = Review
+        fields = ('title', 'text', 'score')
+
+
+class BulkCommentSerializer(serializers.ModelSerializer):
+    """Элемент пакетного создания комментариев: отзыв задаётся id."""
+
+    review = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = Comment
+        fields = ('review', 'text')
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+
+    def validate_ids(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError(
+                'Идентификаторы не должны повторяться.'
+            )
+        return value
+
+
 class UserSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -109,3 +198,27 @@ class SignupSerializer(serializers.Serializer):
     username = serializers.CharField(validators=[username_validator,
                                                  validate_username],
                                      max_length=MAX_LENGTH_USER)
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=MAX_LENGTH_NAME)
+    type = serializers.CharField(required=False)
+
+    def validate_type(self, value):
+        kinds = [kind for kind in value.split(',') if kind]
+        unknown = set(kinds) - set(SearchKind.values)
+        if unknown:
+            raise serializers.ValidationError(
+                f'Неизвестный тип: {", ".join(sorted(unknown))}. '
+                f'Допустимые: {", ".join(SearchKind.values)}.'
+            )
+        return kinds
+
+
+class SearchResultSerializer(serializers.Serializer):
+    type = serializers.CharField()
+    id = serializers.IntegerField()
+    title_id = serializers.IntegerField()
+    review_id = serializers.IntegerField(allow_null=True)
+    text = serializers.CharField()
+    score = serializers.FloatField()
@@ -0,0 +1,106 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.search import index_object
+from reviews.signals import counters_rebuilt
+from .authentication import REVOKED, store_token_version
+from .cache import bump_versions, invalidate
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, **kwargs):
+    invalidate('categories')
+
+
+@receiver([post_save, post_delete], sender=Genre)
+def genre_changed(sender, **kwargs):
+    invalidate('genres')
+
+
+@receiver([post_save, post_delete], sender=Title)
+def title_changed(sender, **kwargs):
+    invalidate('titles')
+
+
+@receiver(post_delete, sender=Title)
+def title_deleted(sender, instance, **kwargs):
+    # Пустой список отличает удалённого родителя от родителя без дочерних
+    # объектов только при чтении, поэтому ETag списка отзывов должен
+    # смениться: иначе клиент получит 304 вместо 404.
+    bump_versions(('reviews', instance.pk))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate('titles')
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    bump_versions(('reviews', instance.title_id))
+    if created or instance.score_changed:
+        invalidate('titles')
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    # Версия комментариев меняется по той же причине, что в title_deleted.
+    bump_versions(('reviews', instance.title_id), ('comments', instance.pk))
+    invalidate('titles')
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    # Версии отзывов, которые отдают comments_count, меняются там же, где
+    # сам счётчик: во вьюсете комментариев, пакетной записи и при удалении
+    # автора.
+    bump_versions(('comments', instance.review_id))
+
+
+# Удалять документы поиска не нужно: они удаляются каскадно по внешним
+# ключам вместе с объектами.
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def index_for_search(sender, instance, created, **kwargs):
+    index_object(instance, created)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    store_token_version(
+        instance.pk, instance.token_version if instance.is_active else REVOKED
+    )
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # Отзывы и комментарии удаляются каскадом в обход вьюсетов, поэтому
+    # счётчики произведений и отзывов правятся здесь, пачкой на таблицу.
+    # Удаление произведения счётчики не затрагивает: вместе с ним исчезают
+    # и его отзывы, и их комментарии.
+    Title.objects.forget_reviews_of(instance)
+    commented = set(Review.objects.filter(
+        comments__author=instance
+    ).values_list('title_id', flat=True))
+    Review.objects.forget_comments_of(instance)
+    bump_versions(*(('reviews', title_id) for title_id in commented))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    store_token_version(instance.pk, REVOKED)
+
+
+@receiver(counters_rebuilt)
+def counters_changed(sender, ratings, title_ids, **kwargs):
+    # Версии хранятся без срока жизни, поэтому пересчёт командой или
+    # импортом без этого отдавал бы 304 со старыми счётчиками.
+    if ratings:
+        invalidate('titles')
+    if title_ids:
+        bump_versions(*(('reviews', title_id) for title_id in title_ids))
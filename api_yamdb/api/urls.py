@@ -4,7 +4,8 @@ from django.urls import include, path
 
 from api.views import (
     CategoryViewSet, CommentViewSet, GenreViewSet, ReviewViewSet, TitleViewSet,
-    UserViewSet, get_token, signup
+    UserViewSet, bulk_comments, bulk_reviews, cache_stats, get_token, search,
+    signup
 )
 
 app_name = 'api'
@@ -29,5 +30,9 @@ auth_endpoints_v1 = [
 
 urlpatterns = [
     path('v1/auth/', include(auth_endpoints_v1)),
+    path('v1/cache/stats/', cache_stats, name='cache_stats'),
+    path('v1/search/', search, name='search'),
+    path('v1/reviews/bulk/', bulk_reviews, name='bulk_reviews'),
+    path('v1/comments/bulk/', bulk_comments, name='bulk_comments'),
     path('v1/', include(router_v1.urls)),
 ]
@@ -1,103 +1,273 @@
-from django.db.models import Avg, F
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 
 from rest_framework import viewsets, filters, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.tokens import AccessToken
 
 
 from .permissions import (
     IsAdmin, IsAdminModeratorAuthorOrReadOnly, IsAdminOrReadOnly)
 from reviews.models import (
-    Category, Comment, Genre, Review, Title, User)
+    LEADERBOARD_SETTINGS, SCORES, Category, Comment, Genre, Review, Title,
+    User, score_field)
+from reviews.outbox import queue_mail
+from reviews.search import SearchResults
 from .serializers import (
     CategorySerializer, CommentSerializer, GenreSerializer,
-    ReviewSerializer, TitleResponseSerializer, TitleSerializer,
-    UserSerializer, GetTokenSerializer, SignupSerializer
+    LeaderboardSerializer, ReviewSerializer, TitleRatingSerializer,
+    TitleResponseSerializer, TitleSerializer,
+    UserSerializer, GetTokenSerializer, SignupSerializer,
+    SearchQuerySerializer, SearchResultSerializer, BulkDeleteSerializer,
+    DUPLICATE_REVIEW
 )
+from .authentication import get_access_token, get_full_user
+from .bulk import (
+    create_comments, create_reviews, delete_comments, delete_reviews,
+    overall_status
+)
+from .cache import CachedListMixin, bump_versions, get_stats
+from .conditional import ConditionalGetMixin, ConditionalListMixin
+from .fieldsets import SparseFieldsetMixin
 from .mixins import ModelMixinSet
 from api.filters import TitleFilter
+from api.pagination import OptionalKeysetPagination
 
 
-class CategoryViewSet(ModelMixinSet):
+class CategoryViewSet(ConditionalListMixin, CachedListMixin,
+                      ModelMixinSet):
     """Viewset для модели Category."""
 
+    cache_namespace = 'categories'
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
 
-class GenreViewSet(ModelMixinSet):
+class GenreViewSet(ConditionalListMixin, CachedListMixin,
+                   ModelMixinSet):
     """Viewset для модели Genre."""
 
+    cache_namespace = 'genres'
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalGetMixin, CachedListMixin, SparseFieldsetMixin,
+                   viewsets.ModelViewSet):
     """Viewset для модели Title."""
-    queryset = Title.objects.annotate(
-        rating=Avg(F('reviews__score'))
+
+    cache_namespace = 'titles'
+    fieldset_sources = {'rating': ('score_sum', 'reviews_count')}
+    queryset = Title.objects.select_related('category').prefetch_related(
+        'genre'
     ).order_by(*Title._meta.ordering)
     permission_classes = (IsAdminOrReadOnly,)
+    pagination_class = OptionalKeysetPagination
     http_method_names = ['get', 'post', 'patch', 'delete']
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ('name', 'year')
     filterset_class = TitleFilter
 
+    def get_queryset(self):
+        if self.action == 'leaderboard':
+            return self.queryset.filter(
+                reviews_count__gte=LEADERBOARD_SETTINGS['MIN_REVIEWS']
+            ).order_by('-weighted_rating', '-id')
+        return super().get_queryset()
+
     def get_serializer_class(self):
         if self.action == 'create' or self.action == 'partial_update':
             return TitleSerializer
+        if self.action == 'rating':
+            return TitleRatingSerializer
+        if self.action == 'leaderboard':
+            return LeaderboardSerializer
         return TitleResponseSerializer
 
+    @action(detail=False)
+    def leaderboard(self, request, *args, **kwargs):
+        """Произведения по убыванию взвешенной оценки.
+
+        Принимает те же фильтры, что и список произведений. Оценка хранится
+        в строке произведения и обновляется вместе с рейтингом, так что
+        страница читается по индексу, без сортировки всей таблицы.
+        """
+        return self.list(request, *args, **kwargs)
+
+    @action(detail=True)
+    def rating(self, request, *args, **kwargs):
+        """Средняя оценка и число отзывов с каждой оценкой от 1 до 10.
+
+        Всё читается из сохранённых счётчиков произведения, без обхода
+        отзывов.
+        """
+        return self.conditional(self.get_rating, request, *args, **kwargs)
+
+    def get_rating(self, request, pk):
+        title = get_object_or_404(
+            Title.objects.only(
+                'id', 'score_sum', 'reviews_count',
+                *(score_field(score) for score in SCORES)
+            ),
+            pk=pk
+        )
+        return Response(self.get_serializer(title).data)
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, SparseFieldsetMixin,
+                    viewsets.ModelViewSet):
     """Viewset для модели Review."""
 
+    fieldset_sources = {'author': ('author__username',)}
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    pagination_class = OptionalKeysetPagination
     http_method_names = ['get', 'post', 'patch', 'delete']
     permission_classes = (IsAdminModeratorAuthorOrReadOnly,)
 
     def get_title(self):
-        return get_object_or_404(Title, id=self.kwargs['title_id'])
+        """Произведение из URL; загружается не больше одного раза за запрос."""
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title.objects.only('id'), id=self.kwargs['title_id']
+            )
+        return self._title
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return Review.objects.filter(
+            title_id=self.kwargs['title_id']
+        ).select_related('author')
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page:
+            # Отзывов нет: отличаем пустое произведение от несуществующего.
+            self.get_title()
+        return page
+
+    def get_version_scope(self):
+        return ('reviews', self.kwargs['title_id'])
+
+    def get_validator(self):
+        state = self.get_queryset().aggregate(
+            count=Count('pk'), last=Max('pub_date')
+        )
+        return [*super().get_validator(), state['count'], state['last']]
 
     def perform_create(self, serializer):
-        serializer.save(
-            author=self.request.user,
-            title=self.get_title()
-        )
+        # Повторный отзыв отсекает ограничение unique_author_title: проверка
+        # перед вставкой стоила бы запроса и не спасала от гонки
+        # параллельных запросов.
+        try:
+            with transaction.atomic():
+                review = serializer.save(
+                    author=self.request.user,
+                    title=self.get_title()
+                )
+                Title.objects.change_rating(
+                    review.title_id, added=review.score
+                )
+        except IntegrityError:
+            if not Review.objects.filter(
+                author_id=self.request.user.pk, title_id=self.get_title().pk
+            ).exists():
+                raise
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [DUPLICATE_REVIEW]}
+            )
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        # Оценка перечитывается под блокировкой строки: объект загружен до
+        # транзакции, и параллельные PATCH вычли бы из рейтинга одну и ту
+        # же устаревшую оценку.
+        old_score = Review.objects.select_for_update().values_list(
+            'score', flat=True
+        ).get(pk=serializer.instance.pk)
+        review = serializer.save()
+        Title.objects.change_rating(
+            review.title_id, added=review.score, removed=old_score
+        )
 
-class CommentViewSet(viewsets.ModelViewSet):
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Как и в perform_update: оценка, загруженная до транзакции, могла
+        # уже измениться, а отзыв - быть удалён параллельным запросом.
+        locked = Review.objects.select_for_update().filter(
+            pk=instance.pk
+        ).values_list('title_id', 'score').first()
+        if locked is None:
+            return
+        title_id, score = locked
+        Title.objects.change_rating(title_id, removed=score)
+        instance.delete()
+
+
+class CommentViewSet(ConditionalGetMixin, SparseFieldsetMixin,
+                     viewsets.ModelViewSet):
     """Viewset для модели Comment."""
 
+    fieldset_sources = {'author': ('author__username',)}
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = (IsAdminModeratorAuthorOrReadOnly,)
+    pagination_class = OptionalKeysetPagination
     http_method_names = ['get', 'post', 'patch', 'delete']
 
     def get_review(self):
-        title_id = self.kwargs.get('title_id')
-        review_id = self.kwargs.get('review_id')
-        return get_object_or_404(Review, id=review_id, title__id=title_id)
+        """Отзыв из URL; загружается не больше одного раза за запрос."""
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review.objects.only('id', 'title_id'),
+                id=self.kwargs['review_id'],
+                title_id=self.kwargs['title_id']
+            )
+        return self._review
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return Comment.objects.filter(
+            review_id=self.kwargs['review_id'],
+            review__title_id=self.kwargs['title_id']
+        ).select_related('author')
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page:
+            # Комментариев нет: отличаем пустой отзыв от несуществующего.
+            self.get_review()
+        return page
+
+    def get_version_scope(self):
+        return ('comments', self.kwargs['review_id'])
+
+    def get_validator(self):
+        state = self.get_queryset().aggregate(
+            count=Count('pk'), last=Max('pub_date')
+        )
+        return [*super().get_validator(), state['count'], state['last']]
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(
+        comment = serializer.save(
             author=self.request.user,
             review=self.get_review()
         )
+        Review.objects.change_comments_count(comment.review_id, 1)
+        # Отзывы отдают comments_count: их кеш и ETag тоже устаревают.
+        bump_versions(('reviews', comment.review.title_id))
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        Review.objects.change_comments_count(instance.review_id, -1)
+        instance.delete()
+        bump_versions(('reviews', self.kwargs['title_id']))
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -115,18 +285,36 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(methods=['get', 'patch'], detail=False,
             permission_classes=(permissions.IsAuthenticated,))
     def me(self, request):
+        user = get_full_user(request.user)
         if request.method == 'PATCH':
             serializer = UserSerializer(
-                request.user, data=request.data,
+                user, data=request.data,
                 partial=True, context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
-            serializer.save(role=request.user.role)
+            serializer.save(role=user.role)
             return Response(serializer.data, status=status.HTTP_200_OK)
-        serializer = UserSerializer(request.user)
+        serializer = UserSerializer(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+def find_signup_user(username, email):
+    """Разбирает регистрацию по одной выборке пользователей.
+
+    Возвращает существующего пользователя с той же парой username и email,
+    либо текст ошибки, если одно из значений занято другим пользователем.
+    """
+    users = list(User.objects.filter(Q(username=username) | Q(email=email)))
+    for user in users:
+        if user.username == username and user.email == email:
+            return user, None
+    if any(user.email == email for user in users):
+        return None, {'email': 'Пользователь с таким email уже существует.'}
+    if users:
+        return None, {'error': 'Пользователь с таким именем уже существует.'}
+    return None, None
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def signup(request):
@@ -134,23 +322,20 @@ def signup(request):
     serializer.is_valid(raise_exception=True)
     email = serializer.validated_data.get('email',)
     username = serializer.validated_data.get('username',)
-    if User.objects.filter(email=email).exists():
-        if not User.objects.filter(username=username, email=email).exists():
-            return Response(
-                {'email': 'Пользователь с таким email уже существует.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-    if User.objects.filter(username=username).exists():
-        if not User.objects.filter(username=username, email=email).exists():
-            return Response(
-                {'error': 'Пользователь с таким именем уже существует.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-    user, _ = User.objects.get_or_create(username=username, email=email)
+    user, error = find_signup_user(username, email)
+    if user is None and error is None:
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username=username, email=email)
+        except IntegrityError:
+            # Параллельная регистрация успела занять username или email.
+            user, error = find_signup_user(username, email)
+    if user is None:
+        return Response(error, status=status.HTTP_400_BAD_REQUEST)
     confirmation_code = default_token_generator.make_token(user)
     subject = 'Регистрация на YAMDB'
     message = f'Код подтверждения: {confirmation_code}'
-    send_mail(subject, message, 'YAMDB', [email])
+    queue_mail(subject, message, 'YAMDB', [email])
     return Response(
         {'email': email, 'username': user.username},
         status=status.HTTP_200_OK
@@ -167,7 +352,69 @@ def get_token(request):
     confirmation_code = serializer.validated_data.get('confirmation_code')
     user = get_object_or_404(User, username=username)
     if default_token_generator.check_token(user, confirmation_code):
-        token = AccessToken.for_user(user)
+        token = get_access_token(user)
         return Response({'token': f'{token}'}, status=status.HTTP_200_OK)
     return Response({'confirmation_code': 'Неверный код подтверждения'},
                     status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def cache_stats(request):
+    """Счётчики попаданий и промахов кеша списков по разделам."""
+    return Response(get_stats(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search(request):
+    """Поиск по произведениям, отзывам и комментариям.
+
+    Параметр q - текст запроса, type - виды объектов через запятую.
+    Результаты упорядочены по релевантности.
+    """
+    serializer = SearchQuerySerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    results = SearchResults(
+        serializer.validated_data['q'], serializer.validated_data.get('type')
+    )
+    paginator = PageNumberPagination()
+    page = paginator.paginate_queryset(results, request)
+    return paginator.get_paginated_response(
+        SearchResultSerializer(page, many=True).data
+    )
+
+
+def bulk_write(request, create, delete):
+    if request.method == 'POST':
+        results = create(request.user, request.data)
+        return Response(
+            results, status=overall_status(results, status.HTTP_201_CREATED)
+        )
+    serializer = BulkDeleteSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    results = delete(request.user, serializer.validated_data['ids'])
+    # У 204 не бывает тела, а результаты по элементам нужны клиенту.
+    return Response(results, status=overall_status(
+        results, status.HTTP_204_NO_CONTENT, status.HTTP_200_OK
+    ))
+
+
+@api_view(['POST', 'DELETE'])
+def bulk_reviews(request):
+    """Пакетная запись отзывов.
+
+    POST принимает массив {"title", "text", "score"}, DELETE - {"ids": [...]}.
+    Ответ - результат для каждого элемента в порядке запроса.
+    """
+    return bulk_write(request, create_reviews, delete_reviews)
+
+
+@api_view(['POST', 'DELETE'])
+def bulk_comments(request):
+    """Пакетная запись комментариев.
+
+    POST принимает массив {"review", "text"}, DELETE - {"ids": [...]}.
+    Ответ - результат для каждого элемента в порядке запроса.
+    """
+    return bulk_write(request, create_comments, delete_comments)
@@ -31,6 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.profiling.ProfilingMiddleware',
+    'api.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,14 +65,135 @@ WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 
 # Database
+# По умолчанию SQLite в каталоге проекта; для PostgreSQL достаточно задать
+# DB_ENGINE=django.db.backends.postgresql и параметры подключения.
+# Соединение живёт DB_CONN_MAX_AGE секунд и переиспользуется запросами;
+# перед каждым запросом оно проверяется (CONN_HEALTH_CHECKS, см. reviews.db).
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_HEALTH_CHECKS', '1') == '1',
     }
 }
 
+# Реплики для чтения: DB_REPLICAS - через запятую файлы SQLite или хосты
+# остальных СУБД, прочие параметры берутся у основной базы. Безопасные
+# запросы к API читают с реплик, после записи клиент DB_REPLICA_STICKY_SECONDS
+# секунд читает с основной базы (см. api.replicas). Для SQLite реплики
+# обновляет команда sync_replicas.
+
+for index, location in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'NAME' if 'sqlite' in DATABASES['default']['ENGINE'] else 'HOST':
+            location.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['reviews.db.ReplicaRouter']
+
+DATABASE_REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    'STICKY_SECONDS': int(os.getenv('DB_REPLICA_STICKY_SECONDS', 5)),
+}
+
+# Параметры каждого нового соединения с SQLite: WAL, чтобы чтение не ждало
+# записи, и ожидание блокировки вместо ошибки database is locked.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+}
+
+
+# Cache
+# Локальная память отдельна для каждого процесса; при нескольких воркерах
+# нужен общий бэкенд (Redis, Memcached), иначе сброс виден только локально.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'yamdb'),
+    }
+}
+
+API_RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# Версии JWT-токенов для их отзыва. Кеш обязан быть общим для всех
+# воркеров: с локальной памятью отозванный токен принимался бы другими
+# процессами до TIMEOUT секунд. check --deploy отклоняет LocMemCache.
+
+TOKEN_VERSIONS = {
+    'CACHE': os.getenv('TOKEN_VERSION_CACHE', 'default'),
+    'TIMEOUT': 300,
+}
+
+
+# Полнотекстовый поиск: auto выбирает FTS5, если SQLite собран с ним.
+
+SEARCH = {
+    'BACKEND': os.getenv('SEARCH_BACKEND', 'auto'),
+}
+
+
+# Рейтинг произведений: средняя оценка сглаживается PRIOR_WEIGHT отзывами с
+# оценкой PRIOR_MEAN. После изменения параметров сохранённые оценки
+# пересчитывает команда rebuild_ratings.
+
+LEADERBOARD = {
+    'PRIOR_MEAN': float(os.getenv('LEADERBOARD_PRIOR_MEAN', 5.5)),
+    'PRIOR_WEIGHT': int(os.getenv('LEADERBOARD_PRIOR_WEIGHT', 5)),
+    'MIN_REVIEWS': int(os.getenv('LEADERBOARD_MIN_REVIEWS', 1)),
+}
+
+
+# Профилирование запросов: заголовок Server-Timing и лог медленных запросов.
+
+API_PROFILING = {
+    'ENABLED': os.getenv('API_PROFILING') == '1',
+    'SLOW_REQUEST_MS': int(os.getenv('SLOW_REQUEST_MS', 500)),
+    'SLOW_QUERY_COUNT': int(os.getenv('SLOW_QUERY_COUNT', 30)),
+    'LOGGER': 'api.slow_requests',
+}
+
+# Лог медленных запросов пишется в файл из SLOW_REQUEST_LOG, иначе в stderr.
+SLOW_REQUEST_LOG = os.getenv('SLOW_REQUEST_LOG')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.FileHandler',
+            'filename': SLOW_REQUEST_LOG,
+            'delay': True,
+        } if SLOW_REQUEST_LOG else {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+        },
+    },
+}
+
 
 # Password validation
 
@@ -118,7 +241,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
@@ -131,3 +254,10 @@ SIMPLE_JWT = {
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+# Письма ставятся в очередь и отправляются командой send_outbox.
+EMAIL_OUTBOX = {
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'POLL_INTERVAL': 2,
+}
@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, Review, Title, User
+from .models import (
+    Category, Comment, Genre, OutgoingEmail, Review, Title, User
+)
 
 admin.site.site_header = 'Панель администратора'
 admin.site.site_title = 'Панель администратора'
@@ -57,9 +59,23 @@ class CommentAdmin(admin.ModelAdmin):
     )
 
 
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'recipient',
+        'subject',
+        'created',
+        'sent_at',
+        'attempts'
+    )
+    list_filter = ('sent_at',)
+    search_fields = ('recipient',)
+
+
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Review, ReviewAdmin)
 admin.site.register(User, UserAdmin)
 admin.site.register(Title, TitleAdmin)
 admin.site.register(Genre, GenreAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
@@ -0,0 +1,354 @@
+"""Потоковая загрузка CSV-выгрузок в базу пачками bulk_create."""
+import csv
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    Category, Comment, CsvImport, Genre, Review, Title, User
+)
+
+DEFAULT_DATA_DIR = settings.BASE_DIR / 'static' / 'data'
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def pk_map(model, *fields):
+    """Словарь «значение из CSV -> pk» по id и по указанным полям."""
+    mapping = {}
+    for pk, *values in model.objects.values_list('pk', *fields).iterator():
+        mapping[str(pk)] = pk
+        for value in values:
+            mapping[value] = pk
+    return mapping
+
+
+def parse_date(value):
+    return parse_datetime(value) if value else timezone.now()
+
+
+@contextmanager
+def keep_csv_dates(model):
+    """Не даёт auto_now_add перезаписать даты, пришедшие из CSV."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def reset_sequences(model):
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class Stage:
+    """Загрузка одного CSV-файла в одну модель."""
+
+    model = None
+    filename = None
+    label = None
+    # Большие файлы можно делить на части и грузить параллельно.
+    parallel = False
+
+    def get_import(self):
+        return CsvImport.objects.filter(filename=self.filename).first()
+
+    def is_loaded(self):
+        """Файл загружен целиком, или таблица заполнена не этой командой."""
+        record = self.get_import()
+        if record is None:
+            return self.model.objects.exists()
+        return record.finished is not None
+
+    def get_maps(self):
+        return {}
+
+    def build(self, row, maps):
+        """Объект модели по строке CSV или None, если ссылки не найдены."""
+        raise NotImplementedError
+
+    def after_load(self):
+        pass
+
+
+class UserStage(Stage):
+    model = User
+    filename = 'users.csv'
+    label = 'Пользователи'
+
+    def build(self, row, maps):
+        return User(
+            id=row['id'],
+            username=row['username'],
+            email=row['email'],
+            role=row['role'],
+            bio=row['bio'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            password=make_password(None),
+        )
+
+
+class CategoryStage(Stage):
+    model = Category
+    filename = 'category.csv'
+    label = 'Категории'
+
+    def build(self, row, maps):
+        return Category(id=row['id'], name=row['name'], slug=row['slug'])
+
+
+class GenreStage(Stage):
+    model = Genre
+    filename = 'genre.csv'
+    label = 'Жанры'
+
+    def build(self, row, maps):
+        return Genre(id=row['id'], name=row['name'], slug=row['slug'])
+
+
+class TitleStage(Stage):
+    model = Title
+    filename = 'titles.csv'
+    label = 'Произведения'
+
+    def get_maps(self):
+        return {'category': pk_map(Category, 'slug')}
+
+    def build(self, row, maps):
+        category_id = maps['category'].get(row['category'])
+        if category_id is None:
+            return None
+        return Title(
+            id=row['id'],
+            name=row['name'],
+            year=int(row['year']),
+            category_id=category_id,
+            description=row.get('description') or None,
+        )
+
+
+class GenreTitleStage(Stage):
+    model = Title.genre.through
+    filename = 'genre_title.csv'
+    label = 'Жанры произведений'
+    parallel = True
+
+    def get_maps(self):
+        return {'title': pk_map(Title), 'genre': pk_map(Genre, 'slug')}
+
+    def build(self, row, maps):
+        title_id = maps['title'].get(row['title_id'])
+        genre_id = maps['genre'].get(row['genre_id'])
+        if title_id is None or genre_id is None:
+            return None
+        return self.model(id=row['id'], title_id=title_id, genre_id=genre_id)
+
+
+class ReviewStage(Stage):
+    model = Review
+    filename = 'review.csv'
+    label = 'Отзывы'
+    parallel = True
+
+    def get_maps(self):
+        return {'title': pk_map(Title), 'author': pk_map(User, 'username')}
+
+    def build(self, row, maps):
+        title_id = maps['title'].get(row['title_id'])
+        author_id = maps['author'].get(row['author'])
+        if title_id is None or author_id is None:
+            return None
+        return Review(
+            id=row['id'],
+            title_id=title_id,
+            author_id=author_id,
+            text=row['text'],
+            score=int(row['score']),
+            pub_date=parse_date(row['pub_date']),
+        )
+
+    def after_load(self):
+        Title.objects.rebuild_ratings()
+
+
+class CommentStage(Stage):
+    model = Comment
+    filename = 'comments.csv'
+    label = 'Комментарии'
+    parallel = True
+
+    def get_maps(self):
+        return {'review': pk_map(Review), 'author': pk_map(User, 'username')}
+
+    def build(self, row, maps):
+        review_id = maps['review'].get(row['review_id'])
+        author_id = maps['author'].get(row['author'])
+        if review_id is None or author_id is None:
+            return None
+        return Comment(
+            id=row['id'],
+            review_id=review_id,
+            author_id=author_id,
+            text=row['text'],
+            pub_date=parse_date(row['pub_date']),
+        )
+
+    def after_load(self):
+        Review.objects.reconcile_comments_counts()
+
+
+# Порядок стадий соответствует зависимостям по внешним ключам.
+STAGES = (
+    UserStage(),
+    CategoryStage(),
+    GenreStage(),
+    TitleStage(),
+    GenreTitleStage(),
+    ReviewStage(),
+    CommentStage(),
+)
+
+
+def insert_rows(stage, rows, maps, batch_size, resume=False):
+    """Вставляет строки пачками, возвращает (загружено, пропущено).
+
+    При продолжении прерванной загрузки строки, уже попавшие в базу,
+    пропускаются по ключу.
+    """
+    loaded = skipped = 0
+    batch = []
+    for row in rows:
+        obj = stage.build(row, maps)
+        if obj is None:
+            skipped += 1
+            continue
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            stage.model.objects.bulk_create(batch, ignore_conflicts=resume)
+            loaded += len(batch)
+            batch = []
+    if batch:
+        stage.model.objects.bulk_create(batch, ignore_conflicts=resume)
+        loaded += len(batch)
+    return loaded, skipped
+
+
+def finish_stage(stage):
+    reset_sequences(stage.model)
+    stage.after_load()
+
+
+def mark_loaded(stage):
+    CsvImport.objects.update_or_create(
+        filename=stage.filename, defaults={'finished': timezone.now()}
+    )
+
+
+def load_stage(stage, path, batch_size=DEFAULT_BATCH_SIZE):
+    """Загружает файл стадии одной транзакцией.
+
+    Возвращает число загруженных и пропущенных строк и затраченное время.
+    """
+    started = time.monotonic()
+    maps = stage.get_maps()
+    # Прервать можно только загрузку по частям: эта идёт одной транзакцией.
+    resume = stage.get_import() is not None
+    with open(path, encoding='utf-8', newline='') as f, \
+            transaction.atomic(), keep_csv_dates(stage.model):
+        loaded, skipped = insert_rows(
+            stage, csv.DictReader(f), maps, batch_size, resume
+        )
+        finish_stage(stage)
+        mark_loaded(stage)
+    return loaded, skipped, time.monotonic() - started
+
+
+def iter_chunks(path, chunk_size):
+    with open(path, encoding='utf-8', newline='') as f:
+        chunk = []
+        for row in csv.DictReader(f):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+# Словари pk воркера: строятся один раз на процесс, а не на каждую часть.
+_worker_maps = {}
+
+
+def init_worker():
+    """Настраивает Django в воркере и не даёт ему унаследовать соединение."""
+    django.setup()
+    connections.close_all()
+
+
+def load_chunk(stage, rows, batch_size, resume):
+    if stage.filename not in _worker_maps:
+        _worker_maps[stage.filename] = stage.get_maps()
+    with transaction.atomic(), keep_csv_dates(stage.model):
+        return insert_rows(
+            stage, rows, _worker_maps[stage.filename], batch_size, resume
+        )
+
+
+def load_stage_parallel(stage, path, workers, batch_size=DEFAULT_BATCH_SIZE,
+                        chunk_size=DEFAULT_CHUNK_SIZE):
+    """Загружает файл стадии частями в пуле процессов.
+
+    Каждая часть пишется своей транзакцией через собственное соединение
+    воркера, поэтому при ошибке уже загруженные части остаются в базе.
+    Стадия считается загруженной только после всех частей; до этого
+    следующий запуск продолжает её, пропуская уже загруженные строки.
+    """
+    started = time.monotonic()
+    loaded = skipped = 0
+    _, created = CsvImport.objects.get_or_create(filename=stage.filename)
+    resume = not created
+    connections.close_all()
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=init_worker) as pool:
+            pending = set()
+            for chunk in iter_chunks(path, chunk_size):
+                pending.add(pool.submit(
+                    load_chunk, stage, chunk, batch_size, resume
+                ))
+                if len(pending) < workers * 2:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_loaded, chunk_skipped = future.result()
+                    loaded += chunk_loaded
+                    skipped += chunk_skipped
+            for future in pending:
+                chunk_loaded, chunk_skipped = future.result()
+                loaded += chunk_loaded
+                skipped += chunk_skipped
+    finally:
+        # Последовательности и счётчики должны соответствовать загруженным
+        # частям, даже если загрузка прервалась.
+        with transaction.atomic():
+            finish_stage(stage)
+    mark_loaded(stage)
+    return loaded, skipped, time.monotonic() - started
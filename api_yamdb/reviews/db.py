@@ -0,0 +1,127 @@
+"""Настройка соединений с базой данных и чтение с реплик.
+
+SQLite по умолчанию пишет журнал отката и держит блокировку файла на
+всё время записи, поэтому читатели ждут писателя. В режиме WAL чтение
+идёт параллельно с записью; параметры задаются при каждом новом
+соединении, так как synchronous, busy_timeout и mmap_size действуют только
+на текущее соединение.
+
+ReplicaRouter отправляет чтение на реплику только внутри запроса, который
+ReplicaMiddleware (api.replicas) разрешила обслуживать с реплик; весь
+запрос читает с одной реплики. Команды, сигналы вне запросов и все записи
+работают с основной базой.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    **getattr(settings, 'SQLITE_PRAGMAS', {}),
+}
+
+REPLICA_SETTINGS = {
+    'ALIASES': [],
+    # Сколько секунд после записи клиент читает с основной базы, чтобы
+    # видеть свои изменения, пока реплики их догоняют.
+    'STICKY_SECONDS': 5,
+    'COOKIE': 'db_primary',
+    **getattr(settings, 'DATABASE_REPLICAS', {}),
+}
+
+PRIMARY = 'default'
+
+# Псевдоним реплики, с которой читает текущий запрос.
+replica_reads = ContextVar('replica_reads', default=None)
+
+
+@contextmanager
+def read_from_replicas():
+    """Чтение внутри блока идёт с одной из реплик."""
+    aliases = REPLICA_SETTINGS['ALIASES']
+    token = replica_reads.set(random.choice(aliases) if aliases else None)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Чтение с реплик, запись и миграции - только в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        alias = replica_reads.get()
+        if alias is None:
+            return PRIMARY
+        # Связанные объекты читаются с той же базы, что и исходный.
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == PRIMARY
+
+
+def replicate(aliases=None):
+    """Копирует основную базу SQLite в реплики.
+
+    Заменяет репликацию СУБД при локальной разработке и в тестах, где
+    реплики - отдельные файлы SQLite. Возвращает обновлённые псевдонимы.
+    """
+    aliases = REPLICA_SETTINGS['ALIASES'] if aliases is None else aliases
+    source = connections[PRIMARY]
+    source.ensure_connection()
+    for alias in aliases:
+        target = connections[alias]
+        target.ensure_connection()
+        source.connection.backup(target.connection)
+    return aliases
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def check_health(connection):
+    """Закрывает постоянное соединение, если база его уже разорвала.
+
+    Django 3.2 проверяет соединение только после ошибки в запросе, поэтому
+    соединение, закрытое сервером за время простоя, иначе всплыло бы
+    ошибкой в первом запросе следующего обращения к API.
+    """
+    if (
+        connection.connection is None
+        or connection.in_atomic_block
+        or not connection.settings_dict.get('CONN_HEALTH_CHECKS')
+    ):
+        return
+    if not connection.is_usable():
+        connection.close()
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    for connection in connections.all():
+        check_health(connection)
@@ -0,0 +1,169 @@
+import re
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from reviews.models import Review, Title, User, UserRole
+
+SORT = 'сортировка без индекса'
+FULL_SCAN = 'полный просмотр таблицы'
+
+# Признаки плохого плана: сортировка во временном B-дереве и чтение
+# таблицы целиком, а не по индексу.
+PROBLEMS = {
+    'sqlite': (
+        (re.compile(r'USE TEMP B-TREE'), SORT),
+        (re.compile(r'^SCAN \S+$'), FULL_SCAN),
+    ),
+    'postgresql': (
+        (re.compile(r'\bSort\b'), SORT),
+        (re.compile(r'Seq Scan'), FULL_SCAN),
+    ),
+}
+# Сортировки, которые индексом не убрать и которые дёшевы по построению.
+ACCEPTED = (
+    (
+        re.compile(r'IN \(%s(, %s)*\)(?!.*\bLIMIT\b)', re.DOTALL),
+        'сортируются только связанные объекты текущей страницы',
+    ),
+    (
+        # Фильтр по жанрам идёт от выбранных жанров через связующую таблицу;
+        # сортировать по имени приходится только найденные произведения.
+        re.compile(r'"id" IN \(SELECT U0\."title_id"'),
+        'сортируются только произведения выбранных жанров',
+    ),
+    (
+        re.compile(r'\bbm25\('),
+        'результаты поиска упорядочены по релевантности',
+    ),
+)
+# Служебные запросы интроспекции схемы не относятся к данным эндпоинта.
+IGNORED = re.compile(r'\bsqlite_master\b|\binformation_schema\b')
+EXPLAIN = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+}
+
+
+def endpoints(title_id, review_id):
+    """Запросы списков так, как их делают клиенты API."""
+    reviews = f'/api/v1/titles/{title_id}/reviews/'
+    comments = f'{reviews}{review_id}/comments/'
+    return (
+        '/api/v1/categories/',
+        '/api/v1/categories/?pagination=cursor',
+        '/api/v1/genres/',
+        '/api/v1/genres/?pagination=cursor',
+        '/api/v1/titles/',
+        '/api/v1/titles/?pagination=cursor',
+        '/api/v1/titles/?genre=drama',
+        '/api/v1/titles/?category=movie',
+        '/api/v1/titles/?year=1994',
+        f'/api/v1/titles/{title_id}/',
+        '/api/v1/titles/leaderboard/',
+        '/api/v1/titles/leaderboard/?pagination=cursor',
+        '/api/v1/titles/leaderboard/?category=movie',
+        '/api/v1/titles/leaderboard/?year=1994',
+        reviews,
+        f'{reviews}?pagination=cursor',
+        f'{reviews}{review_id}/',
+        comments,
+        f'{comments}?pagination=cursor',
+        '/api/v1/users/',
+        '/api/v1/search/?q=фильм',
+    )
+
+
+class Command(BaseCommand):
+    """Команда для проверки планов запросов эндпоинтов."""
+
+    help = (
+        'Выполняет GET-запросы к спискам API, получает план каждого '
+        'SQL-запроса и сообщает о сортировках и просмотрах без индекса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Печатать планы всех запросов, а не только проблемных.'
+        )
+
+    def handle(self, *args, **options):
+        """Обработка команды."""
+        if connection.vendor not in PROBLEMS:
+            raise CommandError(
+                f'Проверка планов не поддерживается для {connection.vendor}.'
+            )
+        review = Review.objects.only('id', 'title_id').first()
+        title_id = review.title_id if review else (
+            Title.objects.values_list('id', flat=True).first() or 1
+        )
+        client = APIClient()
+        client.force_authenticate(User(username='plans', role=UserRole.ADMIN))
+        problems = 0
+        # Отдельный кеш, очищенный перед проверкой: ответы не берутся из
+        # кеша и запросы доходят до базы.
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'check-query-plans',
+        }}):
+            cache.clear()
+            for url in endpoints(title_id, review.pk if review else 1):
+                problems += self.check_endpoint(client, url, options)
+        if problems:
+            raise CommandError(f'Найдено проблемных запросов: {problems}.')
+        print('Все запросы используют индексы.')
+
+    def capture(self, client, url):
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            if (sql.lstrip().upper().startswith('SELECT')
+                    and not IGNORED.search(sql)):
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            client.get(url)
+        return queries
+
+    def check_endpoint(self, client, url, options):
+        problems = 0
+        # Модуль sqlite3 кеширует подготовленные запросы, а EXPLAIN не
+        # замечает изменения схемы: уникальный комментарий заставляет
+        # строить план заново.
+        explain = f'{EXPLAIN[connection.vendor]}/* {uuid4().hex} */ '
+        for sql, params in self.capture(client, url):
+            with connection.cursor() as cursor:
+                cursor.execute(explain + sql, params)
+                plan = [str(row[-1]).strip() for row in cursor.fetchall()]
+            found = {
+                reason
+                for line in plan
+                for pattern, reason in PROBLEMS[connection.vendor]
+                if pattern.search(line)
+            }
+            accepted = [
+                note for pattern, note in ACCEPTED if pattern.search(sql)
+            ]
+            if SORT in found and accepted:
+                found.discard(SORT)
+            else:
+                accepted = []
+            if found:
+                problems += 1
+                print(f'{url}: {", ".join(sorted(found))}')
+            elif not options['verbose_plans']:
+                continue
+            elif accepted:
+                print(f'{url}: допустимо, {accepted[0]}')
+            else:
+                print(f'{url}: ок')
+            print(f'    {sql}')
+            for line in plan:
+                print(f'    | {line}')
+        return problems
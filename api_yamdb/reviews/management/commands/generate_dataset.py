@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from django.core.management import BaseCommand, CommandError, call_command
+
+from reviews.csv_import import DEFAULT_BATCH_SIZE
+from reviews.synthetic import DatasetSize, generate
+
+
+class Command(BaseCommand):
+    """Команда для генерации синтетического набора данных."""
+
+    help = (
+        'Генерирует воспроизводимый набор CSV-файлов в формате import_csv '
+        'и при необходимости сразу загружает его в базу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', type=Path, help='Каталог, куда записать CSV-файлы.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора: одинаковое зерно даёт одинаковые файлы.'
+        )
+        for field, default in vars(DatasetSize()).items():
+            if field == 'skew':
+                continue
+            parser.add_argument(
+                f'--{field}', type=int, default=default,
+                help=f'Сколько строк сгенерировать (по умолчанию {default}).'
+            )
+        parser.add_argument(
+            '--skew', type=float, default=DatasetSize.skew,
+            help='Показатель распределения Ципфа для числа отзывов на '
+                 'произведение: 0 - равномерно.'
+        )
+        parser.add_argument(
+            '--load', action='store_true',
+            help='Загрузить файлы в базу командой import_csv.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Размер пачки для import_csv.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Число процессов для import_csv.'
+        )
+
+    def handle(self, *args, **options):
+        """Обработка команды."""
+        size = DatasetSize(**{
+            field: options[field] for field in vars(DatasetSize())
+        })
+        for field in ('users', 'categories', 'genres'):
+            if getattr(size, field) < 1:
+                raise CommandError(f'--{field} должно быть больше нуля.')
+        counts = generate(options['path'], size, options['seed'])
+        print(
+            'Сгенерировано: {users} пользователей, {titles} произведений, '
+            '{reviews} отзывов, {comments} комментариев.'.format(**counts)
+        )
+        if options['load']:
+            call_command(
+                'import_csv', path=options['path'],
+                batch_size=options['batch_size'], workers=options['workers']
+            )
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+from django.core.management import BaseCommand
+
+from reviews.csv_import import (
+    DEFAULT_BATCH_SIZE, DEFAULT_CHUNK_SIZE, DEFAULT_DATA_DIR, STAGES,
+    load_stage, load_stage_parallel
+)
+from reviews.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """Команда для заполнения базы данных."""
+
+    help = 'Загружает CSV-файлы из static/data пачками bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', type=Path, default=DEFAULT_DATA_DIR,
+            help='Каталог с CSV-файлами.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Сколько строк вставлять одним запросом.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Число процессов для загрузки больших файлов.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help='Сколько строк большого файла отдавать одному процессу.'
+        )
+
+    def handle(self, *args, **options):
+        """Обработка команды."""
+        loaded_any = False
+        for stage in STAGES:
+            path = options['path'] / stage.filename
+            if not path.exists():
+                print(f'{stage.label}: файл {path} не найден.')
+                continue
+            if stage.is_loaded():
+                print(f'{stage.label} уже загружены.')
+                continue
+            if stage.get_import() is not None:
+                print(f'{stage.label}: продолжается прерванная загрузка.')
+            if stage.parallel and options['workers'] > 1:
+                loaded, skipped, seconds = load_stage_parallel(
+                    stage, path, options['workers'], options['batch_size'],
+                    options['chunk_size']
+                )
+            else:
+                loaded, skipped, seconds = load_stage(
+                    stage, path, options['batch_size']
+                )
+            loaded_any = True
+            rate = loaded / seconds if seconds else loaded
+            print(
+                f'{stage.label} загружены: {loaded} строк, '
+                f'пропущено {skipped}, {rate:.0f} строк/с.'
+            )
+        if loaded_any:
+            # bulk_create не вызывает сигналы, индекс строится отдельно.
+            indexed = rebuild_index(options['batch_size'])
+            print(f'Поисковый индекс построен: {indexed} документов.')
@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    """Команда для пересчёта сохранённых рейтингов произведений."""
+
+    help = (
+        'Пересчитывает сумму оценок, число отзывов, распределение оценок '
+        'и взвешенную оценку каждого произведения.'
+    )
+
+    def handle(self, *args, **options):
+        """Обработка команды."""
+        updated = Title.objects.rebuild_ratings()
+        print(f'Рейтинги пересчитаны для {updated} произведений.')
@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand
+
+from reviews.search import get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    """Команда для перестроения поискового индекса."""
+
+    help = (
+        'Заново индексирует произведения, отзывы и комментарии. Нужна после '
+        'загрузки данных в обход API, например командой import_csv.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Сколько документов записывать одним запросом.'
+        )
+
+    def handle(self, *args, **options):
+        """Обработка команды."""
+        indexed = rebuild_index(options['batch_size'])
+        print(f'Проиндексировано {indexed} документов ({get_backend()}).')
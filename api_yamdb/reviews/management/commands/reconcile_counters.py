@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from reviews.models import Review, Title
+
+
+class Command(BaseCommand):
+    """Команда для исправления расхождений сохранённых счётчиков."""
+
+    help = (
+        'Сверяет сумму оценок и число отзывов произведений и число '
+        'комментариев отзывов с таблицами отзывов и комментариев и '
+        'исправляет разошедшиеся значения.'
+    )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        """Обработка команды."""
+        titles = Title.objects.reconcile_ratings()
+        reviews = Review.objects.reconcile_comments_counts()
+        print(
+            f'Исправлено произведений: {titles}, отзывов: {reviews}.'
+        )
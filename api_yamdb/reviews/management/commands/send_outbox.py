@@ -0,0 +1,68 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management import BaseCommand
+
+from reviews.outbox import OUTBOX_SETTINGS, get_stats, send_batch
+
+
+class Command(BaseCommand):
+    """Воркер, отправляющий письма из очереди."""
+
+    help = 'Отправляет письма из очереди пачками через одно соединение.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=OUTBOX_SETTINGS['BATCH_SIZE'],
+            help='Сколько писем брать из очереди за раз.'
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            default=OUTBOX_SETTINGS['POLL_INTERVAL'],
+            help=(
+                'Пауза в секундах, когда готовых к отправке писем нет или '
+                'все попытки прохода неудачны.'
+            )
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help=(
+                'Отправить готовые письма и завершиться; неудачные письма '
+                'остаются ждать повтора.'
+            )
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Показать глубину очереди и задержку отправки и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        """Обработка команды."""
+        if options['stats']:
+            for name, value in get_stats().items():
+                print(f'{name}: {value}')
+            return
+        mail_connection = get_connection()
+        try:
+            while True:
+                sent, failed = send_batch(
+                    options['batch_size'], mail_connection
+                )
+                if sent or failed:
+                    stats = get_stats()
+                    print(
+                        f'Отправлено {sent}, ошибок {failed}, в очереди '
+                        f'{stats["queue_depth"]}, средняя задержка '
+                        f'{stats["average_latency"]}.'
+                    )
+                if sent:
+                    continue
+                # Готовых писем нет или отправить ничего не удалось:
+                # неудачные письма ждут своего времени повтора, а соединение
+                # не держим открытым до следующего прохода.
+                mail_connection.close()
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            mail_connection.close()
@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import connections
+
+from reviews.db import PRIMARY, REPLICA_SETTINGS, replicate
+
+
+class Command(BaseCommand):
+    """Команда для копирования основной базы SQLite в реплики."""
+
+    help = (
+        'Копирует основную базу SQLite в файлы реплик. Заменяет репликацию '
+        'СУБД при локальной разработке; запускается вручную или по '
+        'расписанию.'
+    )
+
+    def handle(self, *args, **options):
+        """Обработка команды."""
+        if not REPLICA_SETTINGS['ALIASES']:
+            raise CommandError('Реплики не настроены, задайте DB_REPLICAS.')
+        if connections[PRIMARY].vendor != 'sqlite':
+            raise CommandError(
+                'Копирование поддерживается только для SQLite, остальные '
+                'СУБД реплицируются своими средствами.'
+            )
+        aliases = replicate()
+        print(f'Обновлены реплики: {", ".join(aliases)}.')
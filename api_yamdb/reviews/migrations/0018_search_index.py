@@ -0,0 +1,102 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+FTS_TABLE = 'reviews_searchdocument_fts'
+
+# Внешний контент: FTS5 хранит только индекс, текст лежит в
+# reviews_searchdocument, а триггеры поддерживают индекс в актуальном
+# состоянии, в том числе при flush и каскадном удалении.
+CREATE_FTS = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"heading, body, content='reviews_searchdocument', content_rowid='id', "
+    f"tokenize='unicode61')",
+    f"CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON reviews_searchdocument "
+    f"BEGIN INSERT INTO {FTS_TABLE}(rowid, heading, body) "
+    f"VALUES (new.id, new.heading, new.body); END",
+    f"CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON reviews_searchdocument "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, heading, body) "
+    f"VALUES ('delete', old.id, old.heading, old.body); END",
+    f"CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE ON reviews_searchdocument "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, heading, body) "
+    f"VALUES ('delete', old.id, old.heading, old.body); "
+    f"INSERT INTO {FTS_TABLE}(rowid, heading, body) "
+    f"VALUES (new.id, new.heading, new.body); END",
+)
+DROP_FTS = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+
+def fts5_supported(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+def create_fts(apps, schema_editor):
+    if not fts5_supported(schema_editor.connection):
+        return
+    for statement in CREATE_FTS:
+        schema_editor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_FTS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0017_title_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('title', 'Произведение'), ('review', 'Отзыв'), ('comment', 'Комментарий')], max_length=16, verbose_name='Вид')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Id объекта')),
+                ('heading', models.TextField(blank=True, verbose_name='Заголовок')),
+                ('body', models.TextField(blank=True, verbose_name='Текст')),
+                ('length', models.PositiveIntegerField(default=0, verbose_name='Число терминов')),
+                ('comment', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.comment')),
+                ('review', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.review')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.title')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ',
+                'verbose_name_plural': 'Поисковые документы',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=254, verbose_name='Термин')),
+                ('frequency', models.PositiveIntegerField(verbose_name='Вес')),
+                ('document', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='reviews.searchdocument')),
+            ],
+            options={
+                'verbose_name': 'Термин',
+                'verbose_name_plural': 'Термины',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term', 'document'], name='search_term_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
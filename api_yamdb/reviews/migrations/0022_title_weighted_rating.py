@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Cast
+
+# Ссылка на вызываемое значение по умолчанию: Django сериализует её по пути
+# импорта, и состояние миграций должно совпадать с моделью.
+import reviews.models
+
+
+def fill_weighted_rating(apps, schema_editor):
+    # Копия формулы reviews.models.bayesian_rating на момент миграции, чтобы
+    # её поведение не менялось вместе с кодом моделей.
+    leaderboard = {
+        'PRIOR_MEAN': 5.5,
+        'PRIOR_WEIGHT': 5,
+        **getattr(settings, 'LEADERBOARD', {}),
+    }
+    weight = float(leaderboard['PRIOR_WEIGHT'])
+    prior = float(leaderboard['PRIOR_MEAN'])
+    Title = apps.get_model('reviews', 'Title')
+    Title.objects.update(weighted_rating=models.ExpressionWrapper(
+        (Cast('score_sum', models.FloatField()) + weight * prior)
+        / (Cast('reviews_count', models.FloatField()) + weight),
+        output_field=models.FloatField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0021_title_score_histogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='weighted_rating',
+            field=models.FloatField(default=reviews.models.prior_mean, editable=False, verbose_name='Взвешенный рейтинг'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['weighted_rating', 'id', 'reviews_count'], name='title_weighted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'weighted_rating', 'id'], name='title_category_weighted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year', 'weighted_rating', 'id'], name='title_year_weighted_idx'),
+        ),
+        migrations.RunPython(fill_weighted_rating, migrations.RunPython.noop),
+    ]
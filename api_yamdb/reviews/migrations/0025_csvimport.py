@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0024_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CsvImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=254, unique=True, verbose_name='Файл')),
+                ('started', models.DateTimeField(auto_now_add=True, verbose_name='Начало загрузки')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершение загрузки')),
+            ],
+            options={
+                'verbose_name': 'Загрузка CSV',
+                'verbose_name_plural': 'Загрузки CSV',
+            },
+        ),
+    ]
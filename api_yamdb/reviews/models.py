@@ -1,10 +1,26 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, FloatField, IntegerField, OuterRef,
+    Subquery, Sum, Value, When
+)
+from django.db.models.functions import Cast, Coalesce
 from django.core.validators import MaxValueValidator, MinValueValidator
 
 from .constants import MAX_LENGTH_NAME, MAX_LENGTH_USER
+from .signals import counters_rebuilt
 from .validators import year_validator, validate_username, username_validator
 
+LEADERBOARD_SETTINGS = {
+    'PRIOR_MEAN': 5.5,
+    'PRIOR_WEIGHT': 5,
+    'MIN_REVIEWS': 1,
+    **getattr(settings, 'LEADERBOARD', {}),
+}
+
 
 class UserRole(models.TextChoices):
     """Роли Юзера."""
@@ -36,11 +52,42 @@ class User(AbstractUser):
         choices=UserRole.choices,
         default=UserRole.USER
     )
+    token_version = models.PositiveIntegerField(
+        'Версия токенов',
+        default=0,
+        editable=False,
+    )
     objects = UserManager()
 
+    # Поля, которые попадают в токен: их изменение отзывает выданные токены.
+    TOKEN_CLAIM_FIELDS = ('username', 'role', 'is_superuser', 'is_active')
+
     class Meta:
         ordering = ('username',)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_claims = instance.get_token_claims()
+        return instance
+
+    def get_token_claims(self):
+        return {
+            field: self.__dict__.get(field)
+            for field in self.TOKEN_CLAIM_FIELDS
+        }
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_claims', None)
+        if loaded is not None and loaded != self.get_token_claims():
+            self.token_version += 1
+            self._loaded_claims = self.get_token_claims()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {
+                    *kwargs['update_fields'], 'token_version'
+                }
+        super().save(*args, **kwargs)
+
     @property
     def is_admin(self):
         return self.role == UserRole.ADMIN or self.is_superuser
@@ -53,6 +100,22 @@ class User(AbstractUser):
         return self.username
 
 
+class TokenUser(User):
+    """Пользователь, восстановленный из claims токена без запроса к базе.
+
+    Заполнены только поля из User.TOKEN_CLAIM_FIELDS и id, поэтому
+    сохранять такой объект нельзя.
+    """
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        raise TypeError(
+            'TokenUser нельзя сохранять, загрузите пользователя из базы.'
+        )
+
+
 class Category(models.Model):
     """Категория."""
 
@@ -64,6 +127,9 @@ class Category(models.Model):
 
     class Meta:
         ordering = ('name',)
+        indexes = [
+            models.Index(fields=('name', 'id'), name='category_name_idx'),
+        ]
         verbose_name = 'Категория'
         verbose_name_plural = 'Категории'
 
@@ -80,6 +146,9 @@ class Genre(models.Model):
 
     class Meta:
         ordering = ('name',)
+        indexes = [
+            models.Index(fields=('name', 'id'), name='genre_name_idx'),
+        ]
         verbose_name = 'Жанр'
         verbose_name_plural = 'Жанры'
 
@@ -92,6 +161,156 @@ class RelatedName:
         default_related_name = '%(class)ss'
 
 
+def shifted(field, deltas):
+    """Выражение: поле плюс сдвиг, свой для каждого pk из deltas."""
+    return F(field) + Case(
+        *(When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()),
+        default=Value(0), output_field=IntegerField(),
+    )
+
+
+SCORES = range(1, 11)
+
+
+def score_field(score):
+    """Поле произведения с числом отзывов с оценкой score."""
+    return f'score_{score}'
+
+
+def score_counter(score):
+    return models.PositiveIntegerField(
+        f'Отзывов с оценкой {score}', default=0, editable=False
+    )
+
+
+def rating_deltas(scores):
+    """Сдвиги полей рейтинга по гистограмме {оценка: сдвиг числа отзывов}.
+
+    Нулевые сдвиги отбрасываются.
+    """
+    deltas = {
+        'score_sum': sum(score * count for score, count in scores.items()),
+        'reviews_count': sum(scores.values()),
+        **{score_field(score): count for score, count in scores.items()},
+    }
+    return {field: delta for field, delta in deltas.items() if delta}
+
+
+def prior_mean():
+    """Взвешенная оценка произведения без отзывов."""
+    return float(LEADERBOARD_SETTINGS['PRIOR_MEAN'])
+
+
+def bayesian_rating(score_sum, reviews_count):
+    """Байесовская оценка по выражениям суммы оценок и числа отзывов.
+
+    К отзывам произведения добавляется PRIOR_WEIGHT воображаемых отзывов
+    с оценкой PRIOR_MEAN: с одним отзывом оценка остаётся близкой к
+    PRIOR_MEAN, с сотнями - приближается к среднему.
+    """
+    weight = float(LEADERBOARD_SETTINGS['PRIOR_WEIGHT'])
+    return ExpressionWrapper(
+        (Cast(score_sum, FloatField()) + weight * prior_mean())
+        / (Cast(reviews_count, FloatField()) + weight),
+        output_field=FloatField(),
+    )
+
+
+def with_weighted_rating(updates):
+    """Дополняет обновление полей рейтинга пересчётом взвешенной оценки."""
+    return {**updates, 'weighted_rating': bayesian_rating(
+        updates.get('score_sum', F('score_sum')),
+        updates.get('reviews_count', F('reviews_count')),
+    )}
+
+
+class TitleQuerySet(models.QuerySet):
+
+    def change_rating(self, title_id, added=None, removed=None):
+        """Учитывает в рейтинге произведения оценку added и убирает removed.
+
+        Сдвигаются сумма оценок, число отзывов и гистограмма оценок.
+        """
+        scores = Counter()
+        if added is not None:
+            scores[added] += 1
+        if removed is not None:
+            scores[removed] -= 1
+        deltas = rating_deltas(scores)
+        if not deltas:
+            return 0
+        return self.filter(pk=title_id).update(**with_weighted_rating({
+            field: F(field) + delta for field, delta in deltas.items()
+        }))
+
+    def change_ratings(self, changes):
+        """То же для нескольких произведений одним запросом.
+
+        changes - словарь {id произведения: {оценка: сдвиг числа отзывов}}.
+        """
+        deltas = defaultdict(dict)
+        for pk, scores in changes.items():
+            for field, delta in rating_deltas(scores).items():
+                deltas[field][pk] = delta
+        if not deltas:
+            return 0
+        return self.filter(pk__in=changes).update(**with_weighted_rating({
+            field: shifted(field, by_title)
+            for field, by_title in deltas.items()
+        }))
+
+    def rebuild_ratings(self):
+        """Пересчитывает поля рейтинга по таблице отзывов."""
+        updated = self.update(**self._actual_ratings())
+        if updated:
+            counters_rebuilt.send(sender=Title, ratings=True, title_ids=())
+        return updated
+
+    def reconcile_ratings(self):
+        """Исправляет только разошедшиеся с отзывами произведения.
+
+        Возвращает число исправленных произведений.
+        """
+        actual = self._actual_ratings()
+        fixed = self.annotate(**{
+            f'actual_{field}': value for field, value in actual.items()
+        }).exclude(**{
+            field: F(f'actual_{field}') for field in actual
+        }).update(**actual)
+        if fixed:
+            counters_rebuilt.send(sender=Title, ratings=True, title_ids=())
+        return fixed
+
+    def forget_reviews_of(self, author):
+        """Вычитает отзывы автора из рейтингов перед удалением автора."""
+        removed = defaultdict(Counter)
+        for title_id, score in Review.objects.filter(
+            author=author
+        ).values_list('title_id', 'score'):
+            removed[title_id][score] -= 1
+        return self.change_ratings(removed)
+
+    @staticmethod
+    def _actual_ratings():
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+
+        def total(aggregate, **filters):
+            return Coalesce(Subquery(reviews.filter(**filters).annotate(
+                total=aggregate
+            ).values('total')), 0)
+
+        return with_weighted_rating({
+            'score_sum': total(Sum('score')),
+            'reviews_count': total(Count('pk')),
+            **{
+                score_field(score): total(Count('pk'), score=score)
+                for score in SCORES
+            },
+        })
+
+
 class Title(models.Model):
     """Произведения."""
 
@@ -108,15 +327,125 @@ class Title(models.Model):
         blank=True,
         null=True,
         verbose_name='Описание')
+    score_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    reviews_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0,
+        editable=False,
+    )
+    # Гистограмма оценок: число отзывов с каждой оценкой от 1 до 10.
+    score_1 = score_counter(1)
+    score_2 = score_counter(2)
+    score_3 = score_counter(3)
+    score_4 = score_counter(4)
+    score_5 = score_counter(5)
+    score_6 = score_counter(6)
+    score_7 = score_counter(7)
+    score_8 = score_counter(8)
+    score_9 = score_counter(9)
+    score_10 = score_counter(10)
+    weighted_rating = models.FloatField(
+        'Взвешенный рейтинг',
+        default=prior_mean,
+        editable=False,
+    )
+    objects = TitleQuerySet.as_manager()
 
     class Meta(RelatedName.Meta):
         ordering = ('name',)
+        # Списки сортируются по (name, id), в том числе после фильтра по
+        # категории или году.
+        indexes = [
+            models.Index(fields=('name', 'id'), name='title_name_idx'),
+            models.Index(fields=('year', 'name', 'id'),
+                         name='title_year_name_idx'),
+            models.Index(fields=('category', 'name', 'id'),
+                         name='title_category_name_idx'),
+            # Рейтинг произведений: общий, по категории и по году. Число
+            # отзывов в конце общего индекса позволяет посчитать страницы
+            # рейтинга по одному индексу.
+            models.Index(fields=('weighted_rating', 'id', 'reviews_count'),
+                         name='title_weighted_idx'),
+            models.Index(fields=('category', 'weighted_rating', 'id'),
+                         name='title_category_weighted_idx'),
+            models.Index(fields=('year', 'weighted_rating', 'id'),
+                         name='title_year_weighted_idx'),
+        ]
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
 
     def __str__(self):
         return self.name
 
+    @property
+    def rating(self):
+        if not self.reviews_count:
+            return None
+        return self.score_sum / self.reviews_count
+
+    @property
+    def scores(self):
+        """Число отзывов с каждой оценкой: {оценка: число}."""
+        return {
+            score: getattr(self, score_field(score)) for score in SCORES
+        }
+
+
+class ReviewQuerySet(models.QuerySet):
+
+    def change_comments_count(self, review_id, delta):
+        """Сдвигает сохранённое число комментариев отзыва."""
+        return self.filter(pk=review_id).update(
+            comments_count=F('comments_count') + delta
+        )
+
+    def change_comments_counts(self, deltas):
+        """То же для нескольких отзывов: {id отзыва: сдвиг}."""
+        if not deltas:
+            return 0
+        return self.filter(pk__in=deltas).update(
+            comments_count=shifted('comments_count', deltas)
+        )
+
+    def reconcile_comments_counts(self):
+        """Исправляет число комментариев у разошедшихся отзывов.
+
+        Возвращает число исправленных отзывов.
+        """
+        actual = Coalesce(Subquery(
+            Comment.objects.filter(review=OuterRef('pk')).order_by().values(
+                'review'
+            ).annotate(total=Count('pk')).values('total')
+        ), 0)
+        drifted = list(self.annotate(actual_comments_count=actual).exclude(
+            comments_count=F('actual_comments_count')
+        ).values_list('pk', 'title_id'))
+        if not drifted:
+            return 0
+        fixed = Review.objects.filter(
+            pk__in=[pk for pk, _ in drifted]
+        ).update(comments_count=actual)
+        counters_rebuilt.send(
+            sender=Review, ratings=False,
+            title_ids={title_id for _, title_id in drifted},
+        )
+        return fixed
+
+    def forget_comments_of(self, author):
+        """Вычитает комментарии автора перед удалением автора."""
+        written = Comment.objects.filter(
+            review=OuterRef('pk'), author=author
+        ).order_by().values('review').annotate(
+            total=Count('pk')
+        ).values('total')
+        return self.filter(comments__author=author).update(
+            comments_count=F('comments_count') - Subquery(written)
+        )
+
 
 class Review(models.Model):
     """Отзыв."""
@@ -132,9 +461,20 @@ class Review(models.Model):
     )
     pub_date = models.DateTimeField('Дата добавления', auto_now_add=True)
     title = models.ForeignKey(Title, on_delete=models.CASCADE)
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    objects = ReviewQuerySet.as_manager()
 
     class Meta(RelatedName.Meta):
         ordering = ('-pub_date',)
+        indexes = [
+            # Отзывы произведения от новых к старым.
+            models.Index(fields=('title', 'pub_date', 'id'),
+                         name='review_title_date_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['author', 'title'],
@@ -147,6 +487,17 @@ class Review(models.Model):
     def __str__(self):
         return f'{self.text[:10]} {self.author} {self.pub_date}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
+    @property
+    def score_changed(self):
+        """Изменилась ли оценка с момента загрузки из базы."""
+        return self.score != getattr(self, '_loaded_score', None)
+
 
 class Comment(models.Model):
     """Комментарий."""
@@ -158,8 +509,147 @@ class Comment(models.Model):
 
     class Meta(RelatedName.Meta):
         ordering = ('pub_date',)
+        indexes = [
+            models.Index(fields=('review', 'pub_date', 'id'),
+                         name='comment_review_date_idx'),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
     def __str__(self):
         return f'{self.text[:10]} {self.author} {self.pub_date}'
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку."""
+
+    subject = models.CharField('Тема', max_length=MAX_LENGTH_NAME)
+    body = models.TextField('Текст')
+    from_email = models.CharField('Отправитель', max_length=MAX_LENGTH_NAME)
+    recipient = models.EmailField('Получатель', max_length=MAX_LENGTH_NAME)
+    created = models.DateTimeField('Дата постановки в очередь',
+                                   auto_now_add=True)
+    sent_at = models.DateTimeField('Дата отправки', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField('Попытки отправки',
+                                                default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    next_attempt_at = models.DateTimeField('Следующая попытка', null=True,
+                                           blank=True)
+
+    class Meta:
+        ordering = ('created',)
+        indexes = [
+            models.Index(fields=('sent_at', 'id'), name='outbox_pending_idx')
+        ]
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.recipient} {self.subject}'
+
+
+class SearchKind(models.TextChoices):
+    """Виды документов поискового индекса."""
+
+    TITLE = 'title', 'Произведение'
+    REVIEW = 'review', 'Отзыв'
+    COMMENT = 'comment', 'Комментарий'
+
+
+class SearchDocument(models.Model):
+    """Документ поискового индекса: основы слов одного объекта.
+
+    Внешние ключи нужны для каскадного удаления: документ исчезает вместе
+    с произведением, отзывом или комментарием.
+    """
+
+    kind = models.CharField('Вид', max_length=16, choices=SearchKind.choices)
+    object_id = models.PositiveBigIntegerField('Id объекта')
+    title = models.ForeignKey(Title, on_delete=models.CASCADE,
+                              related_name='+')
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, null=True,
+                               related_name='+')
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE,
+                                null=True, related_name='+')
+    heading = models.TextField('Заголовок', blank=True)
+    body = models.TextField('Текст', blank=True)
+    length = models.PositiveIntegerField('Число терминов', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('kind', 'object_id'), name='unique_search_document'
+            )
+        ]
+        verbose_name = 'Поисковый документ'
+        verbose_name_plural = 'Поисковые документы'
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
+
+
+class SearchTerm(models.Model):
+    """Вхождение термина в документ для поиска без FTS5.
+
+    Без ограничения внешнего ключа документ удаляется одним запросом,
+    а оставшиеся от него записи отсекаются соединением при поиске и
+    вычищаются командой rebuild_search_index.
+    """
+
+    document = models.ForeignKey(
+        SearchDocument, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+'
+    )
+    term = models.CharField('Термин', max_length=MAX_LENGTH_NAME)
+    frequency = models.PositiveIntegerField('Вес')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('term', 'document'), name='search_term_idx')
+        ]
+        verbose_name = 'Термин'
+        verbose_name_plural = 'Термины'
+
+    def __str__(self):
+        return self.term
+
+
+class DataVersion(models.Model):
+    """Версия области данных для кеша ответов API.
+
+    Основная копия версий хранится в кеше, а запись в базе меняется сразу
+    после коммита данных, до обновления кеша, и доходит до реплик вслед за
+    ними: по ней видно, догнала ли реплика версию из кеша.
+    """
+
+    key = models.CharField('Ключ', max_length=255, primary_key=True)
+    version = models.CharField('Версия', max_length=64)
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.key} {self.version}'
+
+
+class CsvImport(models.Model):
+    """Загрузка CSV-файла командой import_csv.
+
+    Запись создаётся перед загрузкой файла по частям, а дата завершения
+    ставится, когда загружены все части: незавершённая загрузка
+    продолжается при следующем запуске команды, а не пропускается.
+    """
+
+    filename = models.CharField('Файл', max_length=MAX_LENGTH_NAME,
+                                unique=True)
+    started = models.DateTimeField('Начало загрузки', auto_now_add=True)
+    finished = models.DateTimeField('Завершение загрузки', null=True,
+                                    blank=True)
+
+    class Meta:
+        verbose_name = 'Загрузка CSV'
+        verbose_name_plural = 'Загрузки CSV'
+
+    def __str__(self):
+        return self.filename
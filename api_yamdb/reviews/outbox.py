@@ -0,0 +1,147 @@
+"""Очередь исходящих писем: запрос только ставит письмо, воркер отправляет."""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import (
+    Avg, DurationField, ExpressionWrapper, F, Max, Q
+)
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+OUTBOX_SETTINGS = {
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'POLL_INTERVAL': 2,
+    # Пауза перед повторной отправкой в секундах: удваивается с каждой
+    # неудачной попыткой, но не больше MAX_RETRY_DELAY.
+    'RETRY_DELAY': 30,
+    'MAX_RETRY_DELAY': 3600,
+    **getattr(settings, 'EMAIL_OUTBOX', {}),
+}
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    """Аналог send_mail, который только ставит письма в очередь."""
+    OutgoingEmail.objects.bulk_create([
+        OutgoingEmail(
+            subject=subject,
+            body=message,
+            from_email=from_email,
+            recipient=recipient,
+        )
+        for recipient in recipient_list
+    ])
+
+
+def unsent():
+    """Письма, которые ещё будут отправляться."""
+    return OutgoingEmail.objects.filter(
+        sent_at__isnull=True,
+        attempts__lt=OUTBOX_SETTINGS['MAX_ATTEMPTS'],
+    )
+
+
+def pending():
+    """Неотправленные письма, время повторной попытки которых пришло."""
+    return unsent().filter(
+        Q(next_attempt_at__isnull=True)
+        | Q(next_attempt_at__lte=timezone.now())
+    ).order_by('pk')
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(
+        OUTBOX_SETTINGS['RETRY_DELAY'] * 2 ** (attempts - 1),
+        OUTBOX_SETTINGS['MAX_RETRY_DELAY'],
+    ))
+
+
+def mark_failed(message, error):
+    message.last_error = str(error) or type(error).__name__
+    message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+
+
+def send_messages(messages, mail_connection):
+    """Отправляет письма через открытое соединение, возвращает число
+    отправленных."""
+    sent = 0
+    for message in messages:
+        try:
+            EmailMessage(
+                message.subject, message.body, message.from_email,
+                [message.recipient], connection=mail_connection
+            ).send()
+        except Exception as error:
+            mark_failed(message, error)
+        else:
+            message.sent_at = timezone.now()
+            message.last_error = ''
+            message.next_attempt_at = None
+            sent += 1
+    return sent
+
+
+def send_batch(batch_size=None, mail_connection=None):
+    """Отправляет пачку писем через одно соединение с почтовым сервером.
+
+    Переданное соединение остаётся открытым, чтобы воркер мог отправлять
+    им пачку за пачкой. Возвращает число отправленных и неотправленных писем.
+    """
+    batch_size = batch_size or OUTBOX_SETTINGS['BATCH_SIZE']
+    own_connection = mail_connection is None
+    if own_connection:
+        mail_connection = get_connection()
+    sent = failed = 0
+    with transaction.atomic():
+        # Несколько воркеров не возьмут одни и те же письма там, где база
+        # поддерживает SKIP LOCKED. На SQLite воркер должен быть один.
+        messages = list(pending().select_for_update(
+            skip_locked=connection.features.has_select_for_update_skip_locked
+        )[:batch_size])
+        if not messages:
+            return sent, failed
+        for message in messages:
+            message.attempts += 1
+        try:
+            mail_connection.open()
+        except Exception as error:
+            # Почтовый сервер недоступен: попытка засчитывается всей пачке,
+            # и письма ждут повтора, а не выбирают попытки подряд.
+            for message in messages:
+                mark_failed(message, error)
+            failed = len(messages)
+        else:
+            try:
+                sent = send_messages(messages, mail_connection)
+            finally:
+                if own_connection:
+                    mail_connection.close()
+            failed = len(messages) - sent
+        OutgoingEmail.objects.bulk_update(
+            messages, ('attempts', 'sent_at', 'last_error', 'next_attempt_at')
+        )
+    return sent, failed
+
+
+def get_stats(window=timedelta(hours=1)):
+    """Глубина очереди и задержка отправки писем за последний период."""
+    latency = ExpressionWrapper(
+        F('sent_at') - F('created'), output_field=DurationField()
+    )
+    recent = OutgoingEmail.objects.filter(
+        sent_at__gte=timezone.now() - window
+    ).annotate(latency=latency).aggregate(
+        average=Avg('latency'), maximum=Max('latency')
+    )
+    return {
+        'queue_depth': unsent().count(),
+        'failed': OutgoingEmail.objects.filter(
+            sent_at__isnull=True,
+            attempts__gte=OUTBOX_SETTINGS['MAX_ATTEMPTS'],
+        ).count(),
+        'average_latency': recent['average'],
+        'max_latency': recent['maximum'],
+    }
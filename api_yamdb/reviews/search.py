@@ -0,0 +1,295 @@
+"""Полнотекстовый поиск по произведениям, отзывам и комментариям.
+
+Тексты хранятся в SearchDocument уже разобранными на основы слов. Если
+SQLite собран с FTS5, миграция создаёт над этой таблицей индекс FTS5 и
+ранжирование делает bm25() базы. Иначе используется собственный обратный
+индекс SearchTerm и BM25, посчитанный в Python.
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Avg
+
+from .models import (
+    Comment, Review, SearchDocument, SearchKind, SearchTerm, Title
+)
+from .stemmer import terms
+
+MODELS = {
+    SearchKind.TITLE: Title,
+    SearchKind.REVIEW: Review,
+    SearchKind.COMMENT: Comment,
+}
+
+FTS_TABLE = 'reviews_searchdocument_fts'
+
+SEARCH_SETTINGS = {
+    # auto - FTS5, если есть его таблица, иначе python.
+    'BACKEND': 'auto',
+    # Во сколько раз слово из названия произведения весомее слова из
+    # описания.
+    'HEADING_WEIGHT': 2.0,
+    'BATCH_SIZE': 1000,
+    **getattr(settings, 'SEARCH', {}),
+}
+
+# Параметры BM25.
+K1 = 1.2
+B = 0.75
+
+_fts_available = {}
+
+
+def get_backend():
+    backend = SEARCH_SETTINGS['BACKEND']
+    if backend != 'auto':
+        return backend
+    if connection.alias not in _fts_available:
+        _fts_available[connection.alias] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return 'fts5' if _fts_available[connection.alias] else 'python'
+
+
+def document_fields(obj):
+    """Поля документа индекса для произведения, отзыва или комментария.
+
+    У комментария title_id берётся из уже загруженного отзыва; если отзыв
+    не загружен, поле пропускается - при обновлении оно не меняется.
+    """
+    if isinstance(obj, Title):
+        heading, body = terms(obj.name), terms(obj.description)
+        return {
+            'kind': SearchKind.TITLE, 'object_id': obj.pk, 'title_id': obj.pk,
+            'heading': ' '.join(heading), 'body': ' '.join(body),
+            'length': len(heading) + len(body),
+        }
+    body = terms(obj.text)
+    fields = {
+        'object_id': obj.pk, 'heading': '', 'body': ' '.join(body),
+        'length': len(body),
+    }
+    if isinstance(obj, Review):
+        return {**fields, 'kind': SearchKind.REVIEW, 'title_id': obj.title_id,
+                'review_id': obj.pk}
+    fields.update(kind=SearchKind.COMMENT, review_id=obj.review_id,
+                  comment_id=obj.pk)
+    if Comment.review.is_cached(obj):
+        fields['title_id'] = obj.review.title_id
+    return fields
+
+
+def document_terms(document):
+    """Веса терминов документа: слова заголовка весомее."""
+    weights = Counter()
+    for term in document.heading.split():
+        weights[term] += SEARCH_SETTINGS['HEADING_WEIGHT']
+    for term in document.body.split():
+        weights[term] += 1
+    return [
+        SearchTerm(document_id=document.pk, term=term,
+                   frequency=math.ceil(weight))
+        for term, weight in weights.items()
+    ]
+
+
+def index_object(obj, created=False):
+    """Добавляет объект в индекс или обновляет его документ."""
+    fields = document_fields(obj)
+    lookup = {'kind': fields['kind'], 'object_id': fields['object_id']}
+    if not created and SearchDocument.objects.filter(**lookup).update(
+        **fields
+    ):
+        if get_backend() == 'python':
+            document = SearchDocument.objects.get(**lookup)
+            SearchTerm.objects.filter(document_id=document.pk).delete()
+            SearchTerm.objects.bulk_create(document_terms(document))
+        # Индекс FTS5 обновляют триггеры, достаточно записи документа.
+        return
+    if 'title_id' not in fields:
+        fields['title_id'] = obj.review.title_id
+    document = SearchDocument.objects.create(**fields)
+    if get_backend() == 'python':
+        SearchTerm.objects.bulk_create(document_terms(document))
+
+
+def index_new_objects(objects):
+    """Добавляет в индекс пачку только что созданных объектов одного вида.
+
+    У комментариев должен быть загружен отзыв (см. document_fields).
+    """
+    documents = [SearchDocument(**document_fields(obj)) for obj in objects]
+    if documents:
+        _save_documents(documents, get_backend())
+    return len(documents)
+
+
+def rebuild_index(batch_size=None):
+    """Строит индекс заново по всем объектам, возвращает число документов."""
+    batch_size = batch_size or SEARCH_SETTINGS['BATCH_SIZE']
+    SearchTerm.objects.all().delete()
+    SearchDocument.objects.all().delete()
+    backend = get_backend()
+    indexed = 0
+    querysets = (
+        Title.objects.all(),
+        Review.objects.all(),
+        Comment.objects.select_related('review').only(
+            'id', 'text', 'review', 'review__title_id'
+        ),
+    )
+    for queryset in querysets:
+        batch = []
+        for obj in queryset.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(SearchDocument(**document_fields(obj)))
+            if len(batch) >= batch_size:
+                indexed += _save_documents(batch, backend)
+                batch = []
+        if batch:
+            indexed += _save_documents(batch, backend)
+    return indexed
+
+
+def _save_documents(documents, backend):
+    SearchDocument.objects.bulk_create(documents)
+    if backend == 'python':
+        # bulk_create на SQLite не возвращает pk, перечитываем документы.
+        saved = SearchDocument.objects.filter(
+            kind=documents[0].kind,
+            object_id__in=[document.object_id for document in documents],
+        )
+        SearchTerm.objects.bulk_create(
+            term for document in saved for term in document_terms(document)
+        )
+    return len(documents)
+
+
+DOCUMENT_COLUMNS = 'd.kind, d.object_id, d.title_id, d.review_id'
+
+
+def fts_query(query_terms):
+    return ' '.join(f'"{term}"' for term in query_terms)
+
+
+class SearchResults:
+    """Ленивый ранжированный результат поиска.
+
+    Поддерживает count() и срезы, поэтому его можно отдать Paginator:
+    база отдаёт только одну страницу.
+    """
+
+    def __init__(self, query, kinds=None):
+        self.terms = sorted(set(terms(query)))
+        self.kinds = kinds or SearchKind.values
+        self.backend = get_backend()
+        self._ranked = None
+
+    def count(self):
+        if not self.terms:
+            return 0
+        if self.backend == 'fts5':
+            return self._fts_rows('SELECT COUNT(*)', (), '')[0][0]
+        return len(self._python_ranked())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, page):
+        if not isinstance(page, slice):
+            return self[page:page + 1][0]
+        if not self.terms:
+            return []
+        if self.backend == 'fts5':
+            limit = page.stop - page.start
+            rows = self._fts_rows(
+                f'SELECT {DOCUMENT_COLUMNS}, '
+                f'-bm25({FTS_TABLE}, %s, 1.0) AS score',
+                (SEARCH_SETTINGS['HEADING_WEIGHT'],),
+                'ORDER BY score DESC, d.id LIMIT %s OFFSET %s',
+                (limit, page.start),
+            )
+        else:
+            rows = self._python_ranked()[page]
+        return self._load_hits(rows)
+
+    def _fts_rows(self, select, select_params, tail, tail_params=()):
+        placeholders = ', '.join(['%s'] * len(self.kinds))
+        sql = (
+            f'{select} FROM {FTS_TABLE} '
+            f'JOIN reviews_searchdocument d ON d.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND d.kind IN ({placeholders}) '
+            f'{tail}'
+        )
+        params = (
+            *select_params, fts_query(self.terms), *self.kinds, *tail_params
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _python_ranked(self):
+        """BM25 по таблице SearchTerm; документ должен содержать все слова."""
+        if self._ranked is not None:
+            return self._ranked
+        documents = SearchDocument.objects.filter(kind__in=self.kinds)
+        total = documents.count()
+        average = documents.aggregate(value=Avg('length'))['value'] or 1
+        postings = SearchTerm.objects.filter(
+            term__in=self.terms, document__kind__in=self.kinds
+        ).values_list(
+            'term', 'frequency', 'document__length', 'document__kind',
+            'document__object_id', 'document__title_id',
+            'document__review_id',
+        )
+        matched = defaultdict(dict)
+        lengths = {}
+        frequency_of_term = Counter()
+        for term, frequency, length, *document in postings.iterator():
+            document = tuple(document)
+            matched[document][term] = frequency
+            lengths[document] = length
+            frequency_of_term[term] += 1
+        idf = {
+            term: math.log(1 + (total - count + 0.5) / (count + 0.5))
+            for term, count in frequency_of_term.items()
+        }
+        ranked = []
+        for document, found in matched.items():
+            if len(found) < len(self.terms):
+                continue
+            norm = K1 * (1 - B + B * lengths[document] / average)
+            score = sum(
+                idf[term] * frequency * (K1 + 1) / (frequency + norm)
+                for term, frequency in found.items()
+            )
+            ranked.append((*document, score))
+        ranked.sort(key=lambda row: (-row[-1], row[0], row[1]))
+        self._ranked = ranked
+        return ranked
+
+    def _load_hits(self, rows):
+        """Найденные объекты страницы: по одному запросу на вид."""
+        ids = defaultdict(list)
+        for kind, object_id, *_ in rows:
+            ids[kind].append(object_id)
+        objects = {
+            kind: MODELS[kind].objects.in_bulk(object_ids)
+            for kind, object_ids in ids.items()
+        }
+        hits = []
+        for kind, object_id, title_id, review_id, score in rows:
+            obj = objects[kind].get(object_id)
+            if obj is None:
+                continue
+            hits.append({
+                'type': kind,
+                'id': object_id,
+                'title_id': title_id,
+                'review_id': review_id,
+                'text': obj.name if kind == SearchKind.TITLE else obj.text,
+                'score': round(score, 4),
+            })
+        return hits
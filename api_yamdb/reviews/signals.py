@@ -0,0 +1,7 @@
+"""Сигналы о записях, которые обходят сохранение моделей."""
+from django.dispatch import Signal
+
+# Счётчики пересчитаны пакетным UPDATE: ratings - изменились рейтинги
+# произведений, title_ids - произведения, у отзывов которых изменилось
+# число комментариев.
+counters_rebuilt = Signal()
@@ -0,0 +1,144 @@
+"""Стеммер Snowball для русского языка и разбиение текста на термины.
+
+Реализация повторяет алгоритм
+https://snowballstem.org/algorithms/russian/stemmer.html
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('вшись', 'вши', 'в'),
+    ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв'),
+)
+ADJECTIVE = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей',
+    'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая',
+    'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'й', 'л', 'н'),
+    ('ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло',
+     'ено', 'ует', 'уют', 'ены', 'ить', 'ыть', 'ишь', 'ей', 'уй', 'ил', 'ыл',
+     'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю'),
+)
+NOUN = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие', 'ье',
+    'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом', 'ах', 'ях', 'ию',
+    'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+# Частые слова, которые есть почти в каждом тексте и только раздувают
+# индекс.
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'в', 'во', 'вот', 'все', 'вы', 'да', 'для', 'до',
+    'его', 'ее', 'же', 'за', 'и', 'из', 'или', 'им', 'их', 'к', 'как', 'ко',
+    'ли', 'мы', 'на', 'не', 'но', 'ни', 'о', 'об', 'он', 'она', 'они', 'от',
+    'по', 'с', 'со', 'так', 'то', 'ты', 'у', 'уже', 'что', 'это', 'я',
+    'a', 'an', 'and', 'in', 'of', 'on', 'the', 'to',
+))
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+
+
+def _longest(word, suffixes):
+    for suffix in sorted(suffixes, key=len, reverse=True):
+        if word.endswith(suffix):
+            return suffix
+    return None
+
+
+def _remove_grouped(word, groups):
+    """Удаляет окончание, у первой группы - только после «а» или «я»."""
+    first, second = groups
+    candidates = [
+        suffix for suffix in first
+        if word.endswith(suffix) and word[:-len(suffix)][-1:] in ('а', 'я')
+    ] + [suffix for suffix in second if word.endswith(suffix)]
+    if not candidates:
+        return word, False
+    suffix = max(candidates, key=len)
+    return word[:-len(suffix)], True
+
+
+def _remove(word, suffixes):
+    suffix = _longest(word, suffixes)
+    if suffix is None:
+        return word, False
+    return word[:-len(suffix)], True
+
+
+def _regions(word):
+    """Начала областей RV и R2 в слове."""
+    rv = r1 = r2 = len(word)
+    for index, letter in enumerate(word):
+        if letter in VOWELS:
+            rv = index + 1
+            break
+    for index in range(1, len(word)):
+        if word[index - 1] in VOWELS and word[index] not in VOWELS:
+            r1 = index + 1
+            break
+    for index in range(r1 + 1, len(word)):
+        if word[index - 1] in VOWELS and word[index] not in VOWELS:
+            r2 = index + 1
+            break
+    return rv, r2
+
+
+def stem(word):
+    """Основа русского слова в нижнем регистре."""
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+    prefix, rv_part = word[:rv], word[rv:]
+
+    # Шаг 1.
+    rv_part, removed = _remove_grouped(rv_part, PERFECTIVE_GERUND)
+    if not removed:
+        rv_part, _ = _remove(rv_part, REFLEXIVE)
+        rv_part, removed = _remove(rv_part, ADJECTIVE)
+        if removed:
+            rv_part, _ = _remove_grouped(rv_part, PARTICIPLE)
+        else:
+            rv_part, removed = _remove_grouped(rv_part, VERB)
+            if not removed:
+                rv_part, _ = _remove(rv_part, NOUN)
+
+    # Шаг 2.
+    if rv_part.endswith('и'):
+        rv_part = rv_part[:-1]
+
+    # Шаг 3: словообразовательное окончание удаляется только в R2.
+    suffix = _longest(rv_part, DERIVATIONAL)
+    if suffix and len(prefix) + len(rv_part) - len(suffix) >= r2:
+        rv_part = rv_part[:-len(suffix)]
+
+    # Шаг 4.
+    if rv_part.endswith('нн'):
+        rv_part = rv_part[:-1]
+    else:
+        rv_part, removed = _remove(rv_part, SUPERLATIVE)
+        if removed and rv_part.endswith('нн'):
+            rv_part = rv_part[:-1]
+        elif rv_part.endswith('ь'):
+            rv_part = rv_part[:-1]
+    return prefix + rv_part
+
+
+def terms(text):
+    """Термины текста для индекса: основы слов без стоп-слов."""
+    result = []
+    for word in WORD_RE.findall((text or '').lower().replace('ё', 'е')):
+        if word in STOP_WORDS:
+            continue
+        result.append(stem(word) if CYRILLIC_RE.search(word) else word)
+    return result
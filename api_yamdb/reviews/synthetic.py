@@ -0,0 +1,222 @@
+"""Генерация больших синтетических наборов данных в формате import_csv.
+
+Файлы пишутся потоково, в памяти держится только число отзывов каждого
+произведения, поэтому объём ограничен диском, а не памятью. Один и тот же
+seed при одинаковых параметрах даёт побайтно одинаковые файлы.
+"""
+import csv
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from math import gcd
+
+from .models import UserRole
+
+START_DATE = datetime(2015, 1, 1, tzinfo=timezone.utc)
+DATE_RANGE_SECONDS = 8 * 365 * 24 * 60 * 60
+# Комментарии появляются в течение месяца после отзыва.
+REPLY_RANGE_SECONDS = 30 * 24 * 60 * 60
+FIRST_YEAR = 1900
+LAST_YEAR = 2021
+
+REVIEW_TEXTS = (
+    'Ставлю десять звёзд!',
+    'Неплохо, но второй раз смотреть не буду.',
+    'Скучно и затянуто.',
+    'Один из лучших в своём жанре.',
+    'Ожидал большего после трейлера.',
+)
+COMMENT_TEXTS = (
+    'Полностью согласен.',
+    'Ничего подобного!',
+    'А мне понравилось.',
+    'Спасибо за отзыв.',
+)
+
+
+@dataclass
+class DatasetSize:
+    users: int = 1000
+    categories: int = 10
+    genres: int = 30
+    titles: int = 10000
+    reviews: int = 100000
+    comments: int = 200000
+    # Показатель распределения Ципфа для числа отзывов на произведение:
+    # 0 - равномерно, чем больше, тем сильнее выделяются «хиты».
+    skew: float = 1.0
+
+
+def format_date(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.') + (
+        f'{moment.microsecond // 1000:03d}Z'
+    )
+
+
+def random_date(rng, start=START_DATE, seconds=DATE_RANGE_SECONDS):
+    return start + timedelta(seconds=rng.randrange(seconds))
+
+
+def review_counts(size):
+    """Число отзывов каждого произведения по закону Ципфа.
+
+    Один автор пишет об одном произведении не больше одного отзыва,
+    поэтому у произведения не больше отзывов, чем пользователей.
+    """
+    weights = [1 / rank ** size.skew for rank in range(1, size.titles + 1)]
+    total = sum(weights)
+    counts = [
+        min(size.users, int(size.reviews * weight / total))
+        for weight in weights
+    ]
+    # Остаток от округления раздаём по кругу, начиная с самых популярных.
+    remainder = size.reviews - sum(counts)
+    while remainder > 0:
+        added = 0
+        for index in range(size.titles):
+            if remainder == 0:
+                break
+            if counts[index] < size.users:
+                counts[index] += 1
+                remainder -= 1
+                added += 1
+        if not added:
+            break
+    return counts
+
+
+def coprime_stride(rng, modulus):
+    """Шаг, с которым обход по модулю не повторяет ни одного значения."""
+    if modulus == 1:
+        return 1
+    while True:
+        stride = rng.randrange(1, modulus)
+        if gcd(stride, modulus) == 1:
+            return stride
+
+
+def open_writer(path, filename, header):
+    f = open(path / filename, 'w', encoding='utf-8', newline='')
+    writer = csv.writer(f)
+    writer.writerow(header)
+    return f, writer
+
+
+def write_users(path, size, rng):
+    f, writer = open_writer(
+        path, 'users.csv',
+        ('id', 'username', 'email', 'role', 'bio', 'first_name', 'last_name')
+    )
+    with f:
+        for user_id in range(1, size.users + 1):
+            role = UserRole.USER
+            if rng.random() < 0.01:
+                role = UserRole.MODERATOR
+            writer.writerow((
+                user_id, f'user_{user_id}', f'user_{user_id}@yamdb.fake',
+                role, '', '', ''
+            ))
+
+
+def write_dictionary(path, filename, count, name, slug):
+    f, writer = open_writer(path, filename, ('id', 'name', 'slug'))
+    with f:
+        for pk in range(1, count + 1):
+            writer.writerow((pk, f'{name} {pk}', f'{slug}-{pk}'))
+
+
+def write_titles(path, size, rng):
+    f, writer = open_writer(path, 'titles.csv', ('id', 'name', 'year',
+                                                 'category'))
+    links, link_writer = open_writer(
+        path, 'genre_title.csv', ('id', 'title_id', 'genre_id')
+    )
+    link_id = 0
+    with f, links:
+        for title_id in range(1, size.titles + 1):
+            writer.writerow((
+                title_id, f'Произведение {title_id}',
+                rng.randint(FIRST_YEAR, LAST_YEAR),
+                rng.randint(1, size.categories),
+            ))
+            genres = rng.sample(
+                range(1, size.genres + 1), min(size.genres, rng.randint(1, 3))
+            )
+            for genre_id in genres:
+                link_id += 1
+                link_writer.writerow((link_id, title_id, genre_id))
+
+
+def write_reviews(path, size, rng):
+    """Пишет отзывы и комментарии к ним за один проход.
+
+    Возвращает число записанных отзывов и комментариев.
+    """
+    reviews, review_writer = open_writer(
+        path, 'review.csv',
+        ('id', 'title_id', 'text', 'author', 'score', 'pub_date')
+    )
+    comments, comment_writer = open_writer(
+        path, 'comments.csv',
+        ('id', 'review_id', 'text', 'author', 'pub_date')
+    )
+    counts = review_counts(size)
+    review_id = comment_id = 0
+    total_reviews = max(1, sum(counts))
+    with reviews, comments:
+        # Популярность не совпадает с порядком id: хиты разбросаны по
+        # всему каталогу, как в реальных данных.
+        title_ids = list(range(1, size.titles + 1))
+        rng.shuffle(title_ids)
+        for title_id, count in zip(title_ids, counts):
+            mean_score = rng.randint(1, 10)
+            # Обход пользователей по модулю с взаимно простым шагом даёт
+            # разных авторов без хранения множества уже выбранных.
+            author = rng.randrange(size.users)
+            stride = coprime_stride(rng, size.users)
+            for _ in range(count):
+                review_id += 1
+                score = min(10, max(1, mean_score + rng.randint(-2, 2)))
+                pub_date = random_date(rng)
+                review_writer.writerow((
+                    review_id, title_id, rng.choice(REVIEW_TEXTS),
+                    author + 1, score, format_date(pub_date),
+                ))
+                author = (author + stride) % size.users
+                # Комментарии делятся между отзывами поровну с точностью
+                # до одного, а в сумме их ровно столько, сколько задано.
+                replies = (
+                    review_id * size.comments // total_reviews
+                    - (review_id - 1) * size.comments // total_reviews
+                )
+                for _ in range(replies):
+                    comment_id += 1
+                    comment_writer.writerow((
+                        comment_id, review_id, rng.choice(COMMENT_TEXTS),
+                        rng.randint(1, size.users),
+                        format_date(random_date(
+                            rng, pub_date, REPLY_RANGE_SECONDS
+                        )),
+                    ))
+    return review_id, comment_id
+
+
+def generate(path, size, seed=0):
+    """Записывает полный набор CSV-файлов в каталог path.
+
+    Возвращает словарь с числом строк каждого вида.
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    write_users(path, size, rng)
+    write_dictionary(path, 'category.csv', size.categories,
+                     'Категория', 'category')
+    write_dictionary(path, 'genre.csv', size.genres, 'Жанр', 'genre')
+    write_titles(path, size, rng)
+    reviews, comments = write_reviews(path, size, rng)
+    return {
+        'users': size.users,
+        'titles': size.titles,
+        'reviews': reviews,
+        'comments': comments,
+    }
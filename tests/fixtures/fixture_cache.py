@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import caches
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """База очищается между тестами без сигналов, поэтому и кеш тоже."""
+    for cache in caches.all():
+        cache.clear()
+    yield
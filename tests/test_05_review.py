@@ -1,8 +1,10 @@
 from http import HTTPStatus
 
 import pytest
+from django.core.management import call_command
 from django.db.utils import IntegrityError
 
+from reviews.models import Title
 from tests.utils import (
     check_fields, check_pagination, create_reviews, create_single_review,
     create_titles
@@ -413,3 +415,43 @@ class Test05ReviewAPI:
             f'Проверьте, что PUT-запрос к `{self.REVIEW_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_07_stored_rating(self, admin_client, admin, user_client, user,
+                              moderator_client, moderator):
+        reviews, titles = create_reviews(admin_client, {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        })
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.reviews_count, title.score_sum) == (3, 15), (
+            'Проверьте, что создание отзыва добавляет оценку в сохранённый '
+            'рейтинг произведения.'
+        )
+        url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=title.pk, review_id=reviews[0]['id']
+        )
+        admin_client.patch(url, data={'score': 9})
+        title.refresh_from_db()
+        assert (title.reviews_count, title.score_sum) == (3, 19), (
+            'Проверьте, что изменение оценки отзыва сдвигает сохранённый '
+            'рейтинг произведения.'
+        )
+        admin_client.delete(url)
+        title.refresh_from_db()
+        assert (title.reviews_count, title.score_sum) == (2, 10), (
+            'Проверьте, что удаление отзыва убирает его оценку из '
+            'сохранённого рейтинга произведения.'
+        )
+        response = admin_client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title.pk)
+        )
+        assert response.json()['rating'] == 5
+        Title.objects.update(reviews_count=0, score_sum=0)
+        call_command('rebuild_ratings')
+        title.refresh_from_db()
+        assert (title.reviews_count, title.score_sum) == (2, 10), (
+            'Проверьте, что команда `rebuild_ratings` пересчитывает рейтинг '
+            'по таблице отзывов.'
+        )
+        assert Title.objects.get(pk=titles[1]['id']).reviews_count == 0
@@ -0,0 +1,133 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import (
+    create_categories, create_comments, create_genre, create_titles
+)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08TitleQueries:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLES_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+
+    def test_01_titles_list_queries(self, client, admin_client,
+                                    django_assert_num_queries):
+        titles, categories, genres = create_titles(admin_client)
+        for idx in range(10):
+            admin_client.post(self.TITLES_URL, data={
+                'name': f'Произведение {idx}',
+                'year': 2000 + idx,
+                'genre': [genre['slug'] for genre in genres],
+                'category': categories[idx % 2]['slug'],
+            })
+        # COUNT(*), произведения с категориями, жанры.
+        with django_assert_num_queries(3):
+            response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] == len(titles) + 10
+
+    def test_02_title_detail_queries(self, client, admin_client,
+                                     django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        with django_assert_num_queries(2):
+            response = client.get(
+                self.TITLES_DETAIL_URL_TEMPLATE.format(
+                    title_id=titles[0]['id']
+                )
+            )
+        assert response.status_code == HTTPStatus.OK
+
+    def test_03_title_write_queries(self, admin_client,
+                                    django_assert_num_queries):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        data = {
+            'name': 'Произведение',
+            'year': 1999,
+            'genre': [genre['slug'] for genre in genres],
+            'category': categories[0]['slug'],
+        }
+        # Один из запросов - запись документа поискового индекса.
+        with django_assert_num_queries(10):
+            response = admin_client.post(self.TITLES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED
+        with django_assert_num_queries(10):
+            response = admin_client.patch(
+                self.TITLES_DETAIL_URL_TEMPLATE.format(
+                    title_id=response.json()['id']
+                ),
+                data={'genre': [genres[0]['slug']]}
+            )
+        assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08SignupQueries:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+
+    def test_01_signup_queries(self, client, django_assert_num_queries):
+        data = {'email': 'new@yamdb.fake', 'username': 'new_user'}
+        # Выборка пользователей, создание пользователя, постановка письма;
+        # SQLite дополнительно учитывает BEGIN каждой транзакции.
+        with django_assert_num_queries(5):
+            response = client.post(self.URL_SIGNUP, data=data)
+        assert response.status_code == HTTPStatus.OK
+        # Повторная регистрация: выборка и постановка письма.
+        with django_assert_num_queries(3):
+            response = client.post(self.URL_SIGNUP, data=data)
+        assert response.status_code == HTTPStatus.OK
+        with django_assert_num_queries(1):
+            response = client.post(
+                self.URL_SIGNUP,
+                data={'email': data['email'], 'username': 'other_user'}
+            )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08NestedQueries:
+
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def test_01_nested_list_queries(self, client, admin_client, admin,
+                                    user, user_client, moderator,
+                                    moderator_client,
+                                    django_assert_num_queries):
+        _, reviews, titles = create_comments(admin_client, {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client,
+        })
+        # Версия для ETag, COUNT(*) и страница с авторами.
+        with django_assert_num_queries(3):
+            response = client.get(
+                self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+            )
+        assert response.status_code == HTTPStatus.OK
+        with django_assert_num_queries(3):
+            response = client.get(self.COMMENTS_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id']
+            ))
+        assert response.status_code == HTTPStatus.OK
+
+    def test_02_missing_parent(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get(
+            self.REVIEWS_URL_TEMPLATE.format(title_id=titles[1]['id'])
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = client.get(
+            self.REVIEWS_URL_TEMPLATE.format(title_id=titles[1]['id'] + 100)
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        response = client.get(self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=1
+        ))
+        assert response.status_code == HTTPStatus.NOT_FOUND
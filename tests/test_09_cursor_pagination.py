@@ -0,0 +1,74 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_comments, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09CursorPagination:
+
+    TITLES_URL = '/api/v1/titles/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    @staticmethod
+    def collect(client, url, **headers):
+        ids = []
+        response = client.get(url, **headers)
+        while True:
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert 'count' not in data, (
+                'В режиме курсора ответ не должен содержать `count`.'
+            )
+            ids.extend(item['id'] for item in data['results'])
+            if not data['next']:
+                return ids, data
+            response = client.get(data['next'])
+
+    def test_01_titles_cursor(self, client, admin_client):
+        _, categories, genres = create_titles(admin_client)
+        for idx in range(25):
+            admin_client.post(self.TITLES_URL, data={
+                'name': f'Произведение {idx % 3}',
+                'year': 2000,
+                'genre': [genres[0]['slug']],
+                'category': categories[0]['slug'],
+            })
+        expected = [
+            item['id'] for item in
+            client.get(self.TITLES_URL).json()['results']
+        ]
+        expected += [
+            item['id'] for item in
+            client.get(self.TITLES_URL, {'page': 2}).json()['results']
+        ]
+        ids, last_page = self.collect(
+            client, f'{self.TITLES_URL}?pagination=cursor'
+        )
+        assert ids == expected, (
+            'Проверьте, что в режиме курсора произведения отдаются в том же '
+            'порядке, что и при постраничной пагинации, без пропусков и '
+            'повторов.'
+        )
+        response = client.get(last_page['previous'])
+        assert [
+            item['id'] for item in response.json()['results']
+        ] == ids[-len(last_page['results']) - 20:-len(last_page['results'])]
+
+    def test_02_comments_cursor(self, client, admin_client, admin, user,
+                                user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+        ids, _ = self.collect(client, url, HTTP_X_PAGINATION='cursor')
+        assert ids == [comment['id'] for comment in comments]
+
+    def test_03_invalid_cursor(self, client):
+        response = client.get(f'{self.TITLES_URL}?cursor=broken')
+        assert response.status_code == HTTPStatus.NOT_FOUND
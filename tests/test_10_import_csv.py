@@ -0,0 +1,124 @@
+import csv
+
+import pytest
+from django.core.management import call_command
+from django.db import connections
+
+from reviews.csv_import import DEFAULT_DATA_DIR, ReviewStage
+from reviews.models import Comment, CsvImport, Genre, Review, Title, User
+
+
+def count_rows(filename):
+    with open(DEFAULT_DATA_DIR / filename, encoding='utf-8', newline='') as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+@pytest.fixture
+def file_database(tmp_path, monkeypatch):
+    """Файловая база: воркеры import_csv не видят тестовую базу в памяти."""
+    name = str(tmp_path / 'import.sqlite3')
+    # Для воркеров, запущенных без fork и заново читающих настройки.
+    monkeypatch.setenv('DB_NAME', name)
+    original = connections['default']
+    wrapper = type(original)(
+        {**original.settings_dict, 'NAME': name}, alias='default'
+    )
+    connections['default'] = wrapper
+    call_command('migrate', verbosity=0)
+    yield
+    wrapper.close()
+    connections['default'] = original
+
+
+def snapshot():
+    """Число строк и счётчики, которые пересчитывает загрузка."""
+    return {
+        'counts': [
+            model.objects.count()
+            for model in (User, Genre, Title, Title.genre.through, Review,
+                          Comment)
+        ],
+        'titles': list(Title.objects.order_by('pk').values_list(
+            'pk', 'reviews_count', 'score_sum', 'weighted_rating'
+        )),
+        'reviews': list(Review.objects.order_by('pk').values_list(
+            'pk', 'comments_count'
+        )),
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10ImportCsv:
+
+    def test_01_import_shipped_data(self):
+        call_command('import_csv', batch_size=10)
+        expected = (
+            (User, 'users.csv'),
+            (Genre, 'genre.csv'),
+            (Title, 'titles.csv'),
+            (Title.genre.through, 'genre_title.csv'),
+            (Review, 'review.csv'),
+            (Comment, 'comments.csv'),
+        )
+        for model, filename in expected:
+            assert model.objects.count() == count_rows(filename), (
+                f'Проверьте, что команда `import_csv` загружает все строки '
+                f'файла `{filename}`.'
+            )
+        review = Review.objects.get(pk=1)
+        assert review.pub_date.year == 2019, (
+            'Проверьте, что команда `import_csv` сохраняет дату отзыва из '
+            'CSV-файла.'
+        )
+        title = Title.objects.get(pk=review.title_id)
+        assert title.reviews_count == title.reviews.count(), (
+            'Проверьте, что после загрузки отзывов пересчитывается рейтинг.'
+        )
+
+    def test_02_import_is_idempotent(self):
+        call_command('import_csv')
+        call_command('import_csv')
+        assert Review.objects.count() == count_rows('review.csv')
+
+    def test_03_parallel_matches_sequential(self, request):
+        call_command('import_csv')
+        sequential = snapshot()
+        request.getfixturevalue('file_database')
+        call_command('import_csv', workers=2, chunk_size=7)
+        assert snapshot() == sequential, (
+            'Проверьте, что загрузка `import_csv --workers 2` даёт те же '
+            'строки и счётчики, что и последовательная.'
+        )
+
+    def test_04_parallel_failure_resumes(self, file_database, monkeypatch):
+        build = ReviewStage.build
+
+        def failing_build(stage, row, maps):
+            if row['id'] == '50':
+                raise ValueError('Сбой воркера')
+            return build(stage, row, maps)
+
+        monkeypatch.setattr(ReviewStage, 'build', failing_build)
+        with pytest.raises(ValueError):
+            call_command('import_csv', workers=2, chunk_size=10)
+        assert Review.objects.exists(), (
+            'Части, загруженные до сбоя, остаются в базе.'
+        )
+        assert not CsvImport.objects.get(filename='review.csv').finished, (
+            'Проверьте, что прерванная стадия не считается загруженной.'
+        )
+        title = Title.objects.filter(reviews__isnull=False).first()
+        assert title.reviews_count == title.reviews.count(), (
+            'Проверьте, что рейтинги пересчитываются и после сбоя загрузки.'
+        )
+        monkeypatch.setattr(ReviewStage, 'build', build)
+        call_command('import_csv', workers=2, chunk_size=10)
+        assert Review.objects.count() == count_rows('review.csv'), (
+            'Проверьте, что следующий запуск `import_csv` догружает '
+            'прерванную стадию.'
+        )
+        assert Comment.objects.count() == count_rows('comments.csv')
+        assert all(
+            title.reviews_count == title.reviews.count()
+            for title in Title.objects.all()
+        )
@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_categories, create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11ResponseCache:
+
+    CATEGORIES_URL = '/api/v1/categories/'
+    TITLES_URL = '/api/v1/titles/'
+    STATS_URL = '/api/v1/cache/stats/'
+
+    def test_01_category_list_cached_and_invalidated(self, client,
+                                                     admin_client):
+        create_categories(admin_client)
+        response = client.get(self.CATEGORIES_URL)
+        assert response['X-Cache'] == 'MISS'
+        response = client.get(self.CATEGORIES_URL)
+        assert response['X-Cache'] == 'HIT'
+        assert response.json()['count'] == 2
+
+        admin_client.post(
+            self.CATEGORIES_URL, data={'name': 'Музыка', 'slug': 'music'}
+        )
+        response = client.get(self.CATEGORIES_URL)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что создание категории сбрасывает кеш списка '
+            'категорий.'
+        )
+        assert response.json()['count'] == 3
+
+    def test_02_titles_invalidated_by_review(self, client, admin_client,
+                                             admin, user, user_client):
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        client.get(self.TITLES_URL)
+        assert client.get(self.TITLES_URL)['X-Cache'] == 'HIT'
+
+        user_client.post(
+            f'{self.TITLES_URL}{titles[0]["id"]}/reviews/',
+            data={'text': 'Отзыв', 'score': 1}
+        )
+        response = client.get(self.TITLES_URL)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что новый отзыв сбрасывает кеш списка произведений.'
+        )
+        rated = {item['id']: item['rating'] for item in response.json()[
+            'results'
+        ]}
+        assert rated[titles[0]['id']] == 3
+
+        admin_client.patch(
+            f'{self.TITLES_URL}{titles[0]["id"]}/reviews/'
+            f'{reviews[0]["id"]}/',
+            data={'text': 'Новый текст'}
+        )
+        assert client.get(self.TITLES_URL)['X-Cache'] == 'HIT', (
+            'Изменение текста отзыва не влияет на рейтинг и не должно '
+            'сбрасывать кеш списка произведений.'
+        )
+
+    def test_03_stats(self, client, admin_client, user_client):
+        client.get(self.CATEGORIES_URL)
+        client.get(self.CATEGORIES_URL)
+        assert user_client.get(self.STATS_URL).status_code == (
+            HTTPStatus.FORBIDDEN
+        )
+        response = admin_client.get(self.STATS_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['categories'] == {'hits': 1, 'misses': 1}
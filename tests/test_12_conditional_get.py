@@ -0,0 +1,85 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import (
+    create_comments, create_single_review, create_titles
+)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12ConditionalGet:
+
+    TITLES_URL = '/api/v1/titles/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+    def test_01_titles_etag(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        for url in (self.TITLES_URL, f'{self.TITLES_URL}{titles[0]["id"]}/'):
+            response = client.get(url)
+            etag = response.get('ETag')
+            assert etag, (
+                f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+                'заголовок `ETag`.'
+            )
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+                f'Проверьте, что GET-запрос к `{url}` с актуальным '
+                '`If-None-Match` возвращает ответ со статусом 304.'
+            )
+
+        admin_client.patch(
+            f'{self.TITLES_URL}{titles[0]["id"]}/', data={'name': 'Новое'}
+        )
+        response = client.get(self.TITLES_URL, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после изменения произведения ETag меняется.'
+        )
+
+    def test_02_reviews_and_comments_etag(self, client, admin_client, admin,
+                                          user, user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        etag = client.get(url)['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == (
+            HTTPStatus.NOT_MODIFIED
+        )
+        user_client.patch(f'{url}{reviews[1]["id"]}/', data={'text': 'Да'})
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == (
+            HTTPStatus.OK
+        ), 'Проверьте, что изменение текста отзыва меняет ETag списка.'
+
+        comments_url = f'{url}{reviews[0]["id"]}/comments/'
+        etag = client.get(comments_url)['ETag']
+        admin_client.delete(f'{comments_url}{comments[0]["id"]}/')
+        assert client.get(
+            comments_url, HTTP_IF_NONE_MATCH=etag
+        ).status_code == HTTPStatus.OK
+
+    def test_03_deleted_parent_not_modified(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        reviews_url = self.REVIEWS_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        review = create_single_review(
+            admin_client, titles[1]['id'], 'Отзыв', 5
+        ).json()
+        comments_url = (
+            f'{self.REVIEWS_URL_TEMPLATE.format(title_id=titles[1]["id"])}'
+            f'{review["id"]}/comments/'
+        )
+        etags = {url: client.get(url)['ETag']
+                 for url in (reviews_url, comments_url)}
+        admin_client.delete(f'{self.TITLES_URL}{titles[0]["id"]}/')
+        admin_client.delete(
+            f'{self.REVIEWS_URL_TEMPLATE.format(title_id=titles[1]["id"])}'
+            f'{review["id"]}/'
+        )
+        for url, etag in etags.items():
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                f'Проверьте, что после удаления родителя GET-запрос к '
+                f'`{url}` с прежним `If-None-Match` возвращает 404, а не 304.'
+            )
@@ -0,0 +1,84 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from api.authentication import get_access_token
+from api.checks import check_token_version_cache
+
+
+def claims_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {get_access_token(user)}'
+    )
+    return client
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13StatelessAuth:
+
+    CATEGORIES_URL = '/api/v1/categories/'
+    USERS_URL = '/api/v1/users/'
+    ME_URL = '/api/v1/users/me/'
+
+    def test_01_no_user_query(self, admin):
+        client = claims_client(admin)
+        client.get(self.USERS_URL)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                self.CATEGORIES_URL, data={'name': 'Фильм', 'slug': 'films'}
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        assert not any(
+            'FROM "reviews_user"' in query['sql']
+            for query in context.captured_queries
+        ), (
+            'Проверьте, что токен с claims не требует загрузки пользователя '
+            'из базы для проверки прав.'
+        )
+
+    def test_02_me_loads_profile(self, user):
+        response = claims_client(user).get(self.ME_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['bio'] == user.bio
+        assert response.json()['email'] == user.email
+
+    def test_03_role_change_revokes_token(self, admin_client, user):
+        client = claims_client(user)
+        assert client.get(self.ME_URL).status_code == HTTPStatus.OK
+        response = admin_client.patch(
+            f'{self.USERS_URL}{user.username}/', data={'role': 'moderator'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert client.get(self.ME_URL).status_code == (
+            HTTPStatus.UNAUTHORIZED
+        ), 'Проверьте, что смена роли отзывает ранее выданные токены.'
+        user.refresh_from_db()
+        assert claims_client(user).get(self.ME_URL).status_code == (
+            HTTPStatus.OK
+        )
+
+    def test_04_deleted_user_token_rejected(self, admin_client, user):
+        client = claims_client(user)
+        admin_client.delete(f'{self.USERS_URL}{user.username}/')
+        assert client.get(self.ME_URL).status_code == (
+            HTTPStatus.UNAUTHORIZED
+        )
+
+    def test_05_deploy_requires_shared_cache(self):
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}):
+            errors = check_token_version_cache(None)
+        assert [error.id for error in errors] == ['api.E001'], (
+            'Проверьте, что check --deploy отклоняет кеш версий токенов в '
+            'памяти процесса.'
+        )
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache',
+        }}):
+            assert check_token_version_cache(None) == []
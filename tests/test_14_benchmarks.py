@@ -0,0 +1,407 @@
+"""Бенчмарк всех эндпоинтов API: число запросов, задержка и память.
+
+Число запросов к базе не зависит от машины и проверяется всегда: любой
+лишний запрос по сравнению с базовой линией - регрессия. Задержка и
+память зависят от загрузки машины, поэтому замеряются и сравниваются
+только по запросу.
+
+Набор данных и параметры задаются переменными окружения:
+
+* BENCHMARK=1 - замерять и сравнивать задержку и пиковую память;
+* BENCHMARK_SCALE - множитель размера набора данных (по умолчанию 1);
+* BENCHMARK_REPEAT - сколько раз повторять каждый запрос (20);
+* BENCHMARK_THRESHOLD - допустимый относительный рост задержки p95 и
+  пиковой памяти по сравнению с базовой линией (1.0, то есть вдвое);
+* BENCHMARK_SLACK_MS - абсолютный запас для задержки на шум таймера
+  у быстрых эндпоинтов (5 мс);
+* BENCHMARK_UPDATE_BASELINE=1 - записать в базовую линию измеренные
+  метрики выполненных сценариев; остальные сценарии и метрики остаются
+  как были, поэтому новый сценарий добавляется запуском только его
+  (`-k имя`);
+* BENCHMARK_OUTPUT - файл, куда записать результаты в JSON.
+"""
+import gc
+import json
+import math
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import get_access_token, get_token_version
+from api.urls import router_v1
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.search import rebuild_index
+
+TIMING = os.getenv('BENCHMARK') == '1'
+SCALE = int(os.getenv('BENCHMARK_SCALE', 1))
+REPEAT = int(os.getenv('BENCHMARK_REPEAT', 20))
+THRESHOLD = float(os.getenv('BENCHMARK_THRESHOLD', 1.0))
+SLACK_MS = float(os.getenv('BENCHMARK_SLACK_MS', 5))
+UPDATE_BASELINE = os.getenv('BENCHMARK_UPDATE_BASELINE') == '1'
+OUTPUT = os.getenv('BENCHMARK_OUTPUT')
+BASELINE_PATH = Path(__file__).with_name('benchmark_baseline.json')
+
+RESULTS = {}
+
+
+def seed(scale):
+    """Синтетический набор данных: каждый пользователь оценивает каждое
+    произведение, к каждому отзыву два комментария.
+
+    bulk_create на SQLite не проставляет pk, поэтому объекты перечитываются.
+    """
+    User.objects.bulk_create(
+        User(username=f'bench_user_{idx}', email=f'bench{idx}@yamdb.fake')
+        for idx in range(20 * scale)
+    )
+    users = list(User.objects.order_by('pk'))
+    admin = User.objects.create(
+        username='bench_admin', email='bench_admin@yamdb.fake', role='admin'
+    )
+    Category.objects.bulk_create(
+        Category(name=f'Категория {idx}', slug=f'category-{idx}')
+        for idx in range(5)
+    )
+    categories = list(Category.objects.order_by('pk'))
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {idx}', slug=f'genre-{idx}') for idx in range(10)
+    )
+    genres = list(Genre.objects.order_by('pk'))
+    Title.objects.bulk_create(
+        Title(
+            name=f'Произведение {idx}',
+            year=1900 + idx % 120,
+            category=categories[idx % len(categories)],
+            description='Описание ' * 20,
+        )
+        for idx in range(50 * scale)
+    )
+    titles = list(Title.objects.order_by('pk'))
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title_id=title.pk, genre_id=genre.pk)
+        for idx, title in enumerate(titles)
+        for genre in (genres[idx % 10], genres[(idx + 3) % 10])
+    )
+    Review.objects.bulk_create(
+        Review(
+            title=title, author=user, text='Отзыв ' * 10,
+            score=(title_idx + user_idx) % 10 + 1
+        )
+        for title_idx, title in enumerate(titles)
+        for user_idx, user in enumerate(users)
+    )
+    reviews = list(Review.objects.order_by('pk'))
+    Comment.objects.bulk_create(
+        Comment(review=review, author=users[idx % len(users)],
+                text='Комментарий')
+        for review in reviews
+        for idx in range(2)
+    )
+    Title.objects.rebuild_ratings()
+    Review.objects.reconcile_comments_counts()
+    rebuild_index()
+    return {
+        'admin': admin,
+        'users': users,
+        'category': categories[0],
+        'genres': genres,
+        'title': titles[0],
+        'titles': titles,
+        'review': reviews[0],
+    }
+
+
+def new_user(i):
+    return User.objects.create(
+        username=f'bench_new_{i}', email=f'bench_new_{i}@yamdb.fake'
+    )
+
+
+def new_title(data, i):
+    title = Title.objects.create(
+        name=f'Новое {i}', year=2000, category=data['category']
+    )
+    title.genre.set(data['genres'][:2])
+    return title
+
+
+def new_review(data, i):
+    review = Review.objects.create(
+        title=data['title'], author=new_user(i), text='Отзыв', score=5
+    )
+    Title.objects.change_rating(review.title_id, added=review.score)
+    return review
+
+
+def new_comment(data):
+    comment = Comment.objects.create(
+        review=data['review'], author=data['admin'], text='x'
+    )
+    Review.objects.change_comments_count(comment.review_id, 1)
+    return comment
+
+
+def reviews_url(data):
+    return f'/api/v1/titles/{data["title"].pk}/reviews/'
+
+
+def comments_url(data):
+    return f'{reviews_url(data)}{data["review"].pk}/comments/'
+
+
+# Сценарий: (метод, URL, тело запроса); функция получает набор данных и
+# номер повторения, чтобы для записи каждый раз были новые объекты.
+SCENARIOS = {
+    'categories-list': lambda data, i: (
+        'get', '/api/v1/categories/', None
+    ),
+    'categories-create': lambda data, i: (
+        'post', '/api/v1/categories/',
+        {'name': f'Новая {i}', 'slug': f'new-category-{i}'}
+    ),
+    'categories-destroy': lambda data, i: (
+        'delete', '/api/v1/categories/{}/'.format(
+            Category.objects.create(name='x', slug=f'delete-{i}').slug
+        ), None
+    ),
+    'genres-list': lambda data, i: ('get', '/api/v1/genres/', None),
+    'genres-create': lambda data, i: (
+        'post', '/api/v1/genres/',
+        {'name': f'Новый {i}', 'slug': f'new-genre-{i}'}
+    ),
+    'genres-destroy': lambda data, i: (
+        'delete', '/api/v1/genres/{}/'.format(
+            Genre.objects.create(name='x', slug=f'delete-{i}').slug
+        ), None
+    ),
+    'titles-list': lambda data, i: ('get', '/api/v1/titles/', None),
+    'titles-list-sparse': lambda data, i: (
+        'get', '/api/v1/titles/?fields=id,name,rating', None
+    ),
+    'titles-retrieve': lambda data, i: (
+        'get', f'/api/v1/titles/{data["title"].pk}/', None
+    ),
+    'titles-create': lambda data, i: (
+        'post', '/api/v1/titles/', {
+            'name': f'Новое {i}', 'year': 2000,
+            'genre': [genre.slug for genre in data['genres'][:3]],
+            'category': data['category'].slug,
+        }
+    ),
+    'titles-partial_update': lambda data, i: (
+        'patch', f'/api/v1/titles/{data["title"].pk}/',
+        {'name': f'Переименовано {i}'}
+    ),
+    'titles-destroy': lambda data, i: (
+        'delete', f'/api/v1/titles/{new_title(data, i).pk}/', None
+    ),
+    'titles-leaderboard': lambda data, i: (
+        'get', '/api/v1/titles/leaderboard/', None
+    ),
+    'titles-rating': lambda data, i: (
+        'get', f'/api/v1/titles/{data["title"].pk}/rating/', None
+    ),
+    'review-list': lambda data, i: ('get', reviews_url(data), None),
+    'review-retrieve': lambda data, i: (
+        'get', f'{reviews_url(data)}{data["review"].pk}/', None
+    ),
+    'review-create': lambda data, i: (
+        'post', '/api/v1/titles/{}/reviews/'.format(
+            data['titles'][i % len(data['titles'])].pk
+        ),
+        {'text': 'Новый отзыв', 'score': 7}
+    ),
+    'review-partial_update': lambda data, i: (
+        'patch', f'{reviews_url(data)}{data["review"].pk}/',
+        {'score': i % 10 + 1}
+    ),
+    'review-destroy': lambda data, i: (
+        'delete', f'{reviews_url(data)}{new_review(data, i).pk}/', None
+    ),
+    'comment-list': lambda data, i: ('get', comments_url(data), None),
+    'comment-retrieve': lambda data, i: (
+        'get', f'{comments_url(data)}'
+        f'{data["review"].comments.first().pk}/', None
+    ),
+    'comment-create': lambda data, i: (
+        'post', comments_url(data), {'text': f'Комментарий {i}'}
+    ),
+    'comment-partial_update': lambda data, i: (
+        'patch', f'{comments_url(data)}'
+        f'{data["review"].comments.first().pk}/', {'text': f'Правка {i}'}
+    ),
+    'comment-destroy': lambda data, i: (
+        'delete', f'{comments_url(data)}{new_comment(data).pk}/', None
+    ),
+    'comments-bulk': lambda data, i: (
+        'post', '/api/v1/comments/bulk/',
+        [{'review': data['review'].pk, 'text': 'Комментарий'}] * 10
+    ),
+    'reviews-bulk': lambda data, i: (
+        'post', '/api/v1/reviews/bulk/', [
+            {'title': new_title(data, f'{i}-{n}').pk, 'text': 'Отзыв',
+             'score': 5}
+            for n in range(2)
+        ]
+    ),
+    'search': lambda data, i: ('get', '/api/v1/search/?q=отзывы', None),
+    'users-list': lambda data, i: ('get', '/api/v1/users/', None),
+    'users-retrieve': lambda data, i: (
+        'get', f'/api/v1/users/{data["users"][0].username}/', None
+    ),
+    'users-create': lambda data, i: (
+        'post', '/api/v1/users/',
+        {'username': f'created_{i}', 'email': f'created_{i}@yamdb.fake'}
+    ),
+    'users-partial_update': lambda data, i: (
+        'patch', f'/api/v1/users/{data["users"][0].username}/',
+        {'bio': f'bio {i}'}
+    ),
+    'users-destroy': lambda data, i: (
+        'delete', f'/api/v1/users/{new_user(i).username}/', None
+    ),
+    'users-me': lambda data, i: ('get', '/api/v1/users/me/', None),
+    'auth-signup': lambda data, i: (
+        'post', '/api/v1/auth/signup/',
+        {'username': f'signup_{i}', 'email': f'signup_{i}@yamdb.fake'}
+    ),
+    'auth-token': lambda data, i: (
+        'post', '/api/v1/auth/token/', {
+            'username': data['users'][1].username,
+            'confirmation_code': default_token_generator.make_token(
+                data['users'][1]
+            ),
+        }
+    ),
+}
+
+
+def registered_actions():
+    actions = set()
+    for _, viewset, basename in router_v1.registry:
+        for route in router_v1.get_routes(viewset):
+            for method, action in route.mapping.items():
+                if (hasattr(viewset, action)
+                        and method in viewset.http_method_names):
+                    actions.add(f'{basename}-{action}')
+    return actions
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * share) - 1)]
+
+
+def load_baseline():
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text(encoding='utf-8'))
+
+
+@pytest.fixture(scope='module')
+def dataset(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        data = seed(SCALE)
+    yield data
+    with django_db_blocker.unblock():
+        call_command('flush', interactive=False, verbosity=0)
+    if UPDATE_BASELINE:
+        baseline = load_baseline()
+        for name, result in RESULTS.items():
+            baseline[name] = {**baseline.get(name, {}), **result}
+        BASELINE_PATH.write_text(
+            json.dumps(baseline, indent=2, sort_keys=True) + '\n',
+            encoding='utf-8'
+        )
+    if OUTPUT:
+        Path(OUTPUT).write_text(
+            json.dumps(RESULTS, indent=2, sort_keys=True) + '\n',
+            encoding='utf-8'
+        )
+
+
+def test_every_route_has_scenario():
+    missing = registered_actions() - set(SCENARIOS)
+    assert not missing, (
+        f'Для эндпоинтов {sorted(missing)} нет сценария бенчмарка.'
+    )
+
+
+def measure(request):
+    """Пиковая память одного запроса и задержка REPEAT запросов."""
+    tracemalloc.start()
+    request(1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings = []
+    # Как и timeit, замеряем без сборщика мусора: иначе в p95 попадает
+    # случайная полная сборка, а не работа эндпоинта.
+    gc.collect()
+    gc.disable()
+    try:
+        for i in range(2, REPEAT + 2):
+            started = time.perf_counter()
+            request(i)
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        gc.enable()
+    return {
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', sorted(SCENARIOS))
+def test_benchmark(name, dataset):
+    scenario = SCENARIOS[name]
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {get_access_token(dataset["admin"])}'
+    )
+    get_token_version(dataset['admin'].pk)
+
+    def request(i):
+        method, url, data = scenario(dataset, i)
+        return getattr(client, method)(url, data=data, format='json')
+
+    # Первый запрос - с холодным кешем ответов: по нему считаем запросы.
+    with CaptureQueriesContext(connection) as context:
+        response = request(0)
+    # Следующие запросы сбрасывают журнал запросов соединения, поэтому
+    # число запросов нужно взять сразу.
+    queries = len(context.captured_queries)
+    assert response.status_code < 400, (
+        f'Сценарий `{name}` вернул ответ со статусом '
+        f'{response.status_code}: {response.content[:200]}'
+    )
+    result = {'queries': queries}
+    if TIMING:
+        result.update(measure(request))
+    RESULTS[name] = result
+    baseline = load_baseline().get(name)
+    if UPDATE_BASELINE or baseline is None:
+        return
+    assert result['queries'] <= baseline['queries'], (
+        f'`{name}`: {result["queries"]} запросов к базе вместо '
+        f'{baseline["queries"]} по базовой линии.'
+    )
+    if not TIMING:
+        return
+    for metric, slack in (('p95_ms', SLACK_MS), ('peak_kib', 0)):
+        if metric not in baseline:
+            continue
+        limit = baseline[metric] * (1 + THRESHOLD) + slack
+        assert result[metric] <= limit, (
+            f'`{name}`: {metric} = {result[metric]}, допустимо не больше '
+            f'{limit:.1f} (базовая линия {baseline[metric]}).'
+        )
@@ -0,0 +1,80 @@
+import csv
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Comment, Review, Title, User
+
+OPTIONS = {
+    'users': 50, 'categories': 3, 'genres': 5, 'titles': 40,
+    'reviews': 600, 'comments': 900, 'seed': 7,
+}
+
+
+def read_rows(path, filename):
+    with open(path / filename, encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+class Test15GenerateDataset:
+
+    def test_01_same_seed_same_files(self, tmp_path):
+        call_command('generate_dataset', tmp_path / 'a', **OPTIONS)
+        call_command('generate_dataset', tmp_path / 'b', **OPTIONS)
+        call_command('generate_dataset', tmp_path / 'c',
+                     **{**OPTIONS, 'seed': 8})
+        for filename in ('users.csv', 'titles.csv', 'review.csv',
+                         'comments.csv'):
+            first = (tmp_path / 'a' / filename).read_bytes()
+            assert first == (tmp_path / 'b' / filename).read_bytes(), (
+                f'Проверьте, что при одинаковом зерне файл `{filename}` '
+                f'генерируется одинаково.'
+            )
+        assert (
+            (tmp_path / 'a' / 'review.csv').read_bytes()
+            != (tmp_path / 'c' / 'review.csv').read_bytes()
+        ), 'Проверьте, что зерно влияет на сгенерированные данные.'
+
+    def test_02_counts_and_skew(self, tmp_path):
+        call_command('generate_dataset', tmp_path, **OPTIONS)
+        reviews = read_rows(tmp_path, 'review.csv')
+        assert len(reviews) == OPTIONS['reviews']
+        assert len(read_rows(tmp_path, 'comments.csv')) == (
+            OPTIONS['comments']
+        ), 'Проверьте, что генерируется заданное число комментариев.'
+        pairs = {(row['title_id'], row['author']) for row in reviews}
+        assert len(pairs) == len(reviews), (
+            'Проверьте, что автор пишет не больше одного отзыва на '
+            'произведение.'
+        )
+        per_title = {}
+        for row in reviews:
+            per_title[row['title_id']] = per_title.get(row['title_id'], 0) + 1
+        assert max(per_title.values()) >= 5 * min(per_title.values()), (
+            'Проверьте, что при skew > 0 число отзывов распределено '
+            'неравномерно.'
+        )
+        assert max(per_title.values()) <= OPTIONS['users']
+
+    def test_03_uniform_distribution(self, tmp_path):
+        call_command('generate_dataset', tmp_path,
+                     **{**OPTIONS, 'skew': 0})
+        per_title = {}
+        for row in read_rows(tmp_path, 'review.csv'):
+            per_title[row['title_id']] = per_title.get(row['title_id'], 0) + 1
+        assert set(per_title.values()) == {
+            OPTIONS['reviews'] // OPTIONS['titles']
+        }, 'Проверьте, что при skew=0 отзывы распределены равномерно.'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_load_into_database(self, tmp_path):
+        call_command('generate_dataset', tmp_path, load=True, **OPTIONS)
+        assert User.objects.count() == OPTIONS['users']
+        assert Title.objects.count() == OPTIONS['titles']
+        assert Review.objects.count() == OPTIONS['reviews'], (
+            'Проверьте, что сгенерированные файлы загружаются командой '
+            '`import_csv` без пропусков.'
+        )
+        assert Comment.objects.count() == OPTIONS['comments']
+        title = Title.objects.order_by('-reviews_count').first()
+        assert title.reviews_count == title.reviews.count()
@@ -0,0 +1,78 @@
+import json
+import logging
+
+import pytest
+
+from api.profiling import PROFILING_SETTINGS
+from tests.utils import create_reviews
+
+
+@pytest.fixture
+def profiling(monkeypatch):
+    monkeypatch.setitem(PROFILING_SETTINGS, 'ENABLED', True)
+
+
+def parse_server_timing(header):
+    timings = {}
+    for part in header.split(','):
+        name, *params = part.strip().split(';')
+        timings[name] = dict(param.split('=', 1) for param in params)
+    return timings
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16Profiling:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_disabled_by_default(self, client):
+        response = client.get(self.TITLES_URL)
+        assert 'Server-Timing' not in response, (
+            'Проверьте, что без настройки профилирование выключено.'
+        )
+
+    def test_02_server_timing_header(self, profiling, admin_client):
+        _, titles = create_reviews(admin_client, {})
+        response = admin_client.get(
+            f'{self.TITLES_URL}{titles[0]["id"]}/reviews/'
+        )
+        assert 'Server-Timing' in response, (
+            'Проверьте, что при включённом профилировании ответ содержит '
+            'заголовок `Server-Timing`.'
+        )
+        timings = parse_server_timing(response['Server-Timing'])
+        assert set(timings) == {'db', 'serializer', 'view', 'total'}
+        assert timings['db']['desc'] != '"0 queries"', (
+            'Проверьте, что в `Server-Timing` учитываются запросы к базе.'
+        )
+        assert float(timings['serializer']['dur']) > 0, (
+            'Проверьте, что в `Server-Timing` учитывается время '
+            'сериализации.'
+        )
+        assert (
+            float(timings['view']['dur']) <= float(timings['total']['dur'])
+        )
+
+    def test_03_slow_request_log(self, profiling, monkeypatch, caplog,
+                                 admin_client):
+        monkeypatch.setitem(PROFILING_SETTINGS, 'SLOW_QUERY_COUNT', 1)
+        create_reviews(admin_client, {})
+        caplog.clear()
+        with caplog.at_level(logging.WARNING, PROFILING_SETTINGS['LOGGER']):
+            admin_client.get(self.TITLES_URL)
+        records = [
+            record for record in caplog.records
+            if record.name == PROFILING_SETTINGS['LOGGER']
+        ]
+        assert len(records) == 1, (
+            'Проверьте, что запрос, превысивший порог, пишется в лог '
+            'медленных запросов.'
+        )
+        report = json.loads(records[0].getMessage())
+        assert report['path'] == self.TITLES_URL
+        assert report['queries'] == sum(
+            item['count'] for item in report['sql']
+        ), 'Проверьте, что одинаковые SQL-запросы свёрнуты в один.'
+        assert len({item['sql'] for item in report['sql']}) == len(
+            report['sql']
+        )
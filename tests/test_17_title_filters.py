@@ -0,0 +1,57 @@
+import pytest
+
+from tests.utils import create_titles
+
+
+def names(response):
+    return sorted(item['name'] for item in response.json()['results'])
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17TitleFilters:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_exact_slug_by_default(self, admin_client):
+        create_titles(admin_client)
+        response = admin_client.get(f'{self.TITLES_URL}?category=film')
+        assert response.json()['count'] == 0, (
+            'Проверьте, что по умолчанию `category` сравнивается со slug '
+            'точно.'
+        )
+        response = admin_client.get(f'{self.TITLES_URL}?category=films')
+        assert names(response) == ['Терминатор']
+        response = admin_client.get(f'{self.TITLES_URL}?genre=dram')
+        assert response.json()['count'] == 0
+
+    def test_02_contains_mode(self, admin_client):
+        create_titles(admin_client)
+        response = admin_client.get(
+            f'{self.TITLES_URL}?category=film&slug_match=contains'
+        )
+        assert names(response) == ['Терминатор'], (
+            'Проверьте, что `slug_match=contains` включает поиск по '
+            'подстроке slug.'
+        )
+        response = admin_client.get(
+            f'{self.TITLES_URL}?genre=o&slug_match=contains'
+        )
+        assert names(response) == ['Терминатор'], (
+            'Проверьте, что произведение с несколькими подходящими жанрами '
+            'не дублируется в выдаче.'
+        )
+
+    def test_03_multiple_genres(self, admin_client):
+        create_titles(admin_client)
+        response = admin_client.get(
+            f'{self.TITLES_URL}?genre=horror,comedy,drama'
+        )
+        assert names(response) == ['Крепкий орешек', 'Терминатор'], (
+            'Проверьте, что `genre` принимает несколько slug через запятую '
+            'и не дублирует произведения.'
+        )
+        assert response.json()['count'] == 2
+        response = admin_client.get(f'{self.TITLES_URL}?genre=comedy,drama')
+        assert names(response) == ['Крепкий орешек', 'Терминатор']
+        response = admin_client.get(f'{self.TITLES_URL}?genre=drama,')
+        assert names(response) == ['Крепкий орешек']
@@ -0,0 +1,168 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import SearchDocument, SearchTerm
+from reviews.search import SEARCH_SETTINGS
+from reviews.stemmer import stem, terms
+from tests.utils import create_single_comment, create_single_review
+
+SEARCH_URL = '/api/v1/search/'
+TITLES_URL = '/api/v1/titles/'
+
+
+@pytest.fixture(params=['auto', 'python'])
+def backend(request, monkeypatch):
+    monkeypatch.setitem(SEARCH_SETTINGS, 'BACKEND', request.param)
+    return request.param
+
+
+def create_library(admin_client):
+    admin_client.post('/api/v1/categories/',
+                      data={'name': 'Фильм', 'slug': 'films'})
+    admin_client.post('/api/v1/genres/',
+                      data={'name': 'Драма', 'slug': 'drama'})
+    titles = []
+    for name, description in (
+        ('Побег из Шоушенка', 'Тюремная драма о надежде.'),
+        ('Зелёная миля', 'Надзиратели тюрьмы и чудесный заключённый.'),
+        ('Форрест Гамп', 'Жизнь как коробка шоколадных конфет.'),
+    ):
+        response = admin_client.post(TITLES_URL, data={
+            'name': name, 'year': 1994, 'genre': ['drama'],
+            'category': 'films', 'description': description,
+        })
+        titles.append(response.json())
+    review = create_single_review(
+        admin_client, titles[2]['id'], 'Трогательная история про побеги '
+        'от проблем', 9
+    ).json()
+    comment = create_single_comment(
+        admin_client, titles[2]['id'], review['id'],
+        'Лучшие истории всегда простые'
+    ).json()
+    return titles, review, comment
+
+
+def found(response):
+    return [(item['type'], item['id']) for item in response.json()['results']]
+
+
+class Test18Stemmer:
+
+    def test_01_russian_stems(self):
+        for words in (
+            ('фильм', 'фильмы', 'фильмом', 'фильмах'),
+            ('побег', 'побега', 'побеги'),
+            ('история', 'истории', 'историю'),
+            ('тюремный', 'тюремная', 'тюремного'),
+        ):
+            assert len({stem(word) for word in words}) == 1, (
+                f'Проверьте, что формы {words} приводятся к одной основе.'
+            )
+
+    def test_02_terms(self):
+        assert terms('Ёлка и ЁЖ в Shawshank') == [
+            stem('елка'), stem('еж'), 'shawshank'
+        ], (
+            'Проверьте, что разбиение на термины приводит слова к нижнему '
+            'регистру, заменяет «ё» на «е» и убирает стоп-слова.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18Search:
+
+    def test_01_finds_word_forms(self, backend, client, admin_client):
+        titles, review, comment = create_library(admin_client)
+        response = client.get(SEARCH_URL, {'q': 'побеги'})
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что `{SEARCH_URL}` доступен без авторизации.'
+        )
+        assert found(response) == [
+            ('title', titles[0]['id']), ('review', review['id'])
+        ], (
+            'Проверьте, что поиск находит другие формы слова и ставит '
+            'совпадение в названии выше совпадения в тексте.'
+        )
+        data = response.json()
+        assert data['count'] == 2
+        assert data['results'][1]['title_id'] == titles[2]['id']
+        assert data['results'][0]['text'] == 'Побег из Шоушенка'
+
+        response = client.get(SEARCH_URL, {'q': 'история'})
+        assert set(found(response)) == {
+            ('review', review['id']), ('comment', comment['id'])
+        }, 'Проверьте, что поиск охватывает отзывы и комментарии.'
+        item = [i for i in response.json()['results']
+                if i['type'] == 'comment'][0]
+        assert item['review_id'] == review['id']
+
+    def test_02_all_words_and_type_filter(self, backend, client,
+                                          admin_client):
+        titles, review, _ = create_library(admin_client)
+        response = client.get(SEARCH_URL, {'q': 'тюремная драма'})
+        assert found(response) == [('title', titles[0]['id'])], (
+            'Проверьте, что документ должен содержать все слова запроса.'
+        )
+        response = client.get(SEARCH_URL, {'q': 'истории',
+                                           'type': 'review'})
+        assert found(response) == [('review', review['id'])], (
+            'Проверьте фильтрацию результатов по параметру `type`.'
+        )
+        response = client.get(SEARCH_URL, {'q': 'x', 'type': 'user'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = client.get(SEARCH_URL)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что без параметра `q` возвращается ошибка 400.'
+        )
+
+    def test_03_index_follows_writes(self, backend, client, admin_client):
+        titles, review, _ = create_library(admin_client)
+        admin_client.patch(f'{TITLES_URL}{titles[1]["id"]}/',
+                           data={'name': 'Синяя миля'})
+        assert found(client.get(SEARCH_URL, {'q': 'синий'})) == [
+            ('title', titles[1]['id'])
+        ], 'Проверьте, что изменение объекта обновляет поисковый индекс.'
+        assert found(client.get(SEARCH_URL, {'q': 'зеленая'})) == []
+
+        admin_client.delete(f'{TITLES_URL}{titles[2]["id"]}/')
+        assert found(client.get(SEARCH_URL, {'q': 'истории'})) == [], (
+            'Проверьте, что удаление произведения удаляет из индекса его '
+            'отзывы и комментарии.'
+        )
+        assert not SearchDocument.objects.filter(
+            title_id=titles[2]['id']
+        ).exists()
+
+    def test_04_pagination(self, backend, client, admin_client):
+        admin_client.post('/api/v1/categories/',
+                          data={'name': 'Фильм', 'slug': 'films'})
+        admin_client.post('/api/v1/genres/',
+                          data={'name': 'Драма', 'slug': 'drama'})
+        for idx in range(25):
+            admin_client.post(TITLES_URL, data={
+                'name': f'Комедия {idx}', 'year': 2000, 'genre': ['drama'],
+                'category': 'films',
+            })
+        response = client.get(SEARCH_URL, {'q': 'комедии'})
+        data = response.json()
+        assert data['count'] == 25
+        assert len(data['results']) == 20 and data['next'], (
+            'Проверьте, что результаты поиска разбиты на страницы.'
+        )
+        second = client.get(data['next']).json()['results']
+        assert len(second) == 5
+        ids = {item['id'] for item in data['results'] + second}
+        assert len(ids) == 25
+
+    def test_05_rebuild_command(self, backend, client, admin_client):
+        titles, review, comment = create_library(admin_client)
+        SearchDocument.objects.all().delete()
+        SearchTerm.objects.all().delete()
+        assert found(client.get(SEARCH_URL, {'q': 'побег'})) == []
+        call_command('rebuild_search_index', batch_size=2)
+        assert found(client.get(SEARCH_URL, {'q': 'побег'})) == [
+            ('title', titles[0]['id']), ('review', review['id'])
+        ], 'Проверьте, что команда `rebuild_search_index` строит индекс.'
@@ -0,0 +1,40 @@
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from tests.utils import create_comments
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19QueryPlans:
+
+    def test_01_all_endpoints_use_indexes(self, admin_client, admin,
+                                          capsys):
+        create_comments(admin_client, {admin: admin_client})
+        call_command('check_query_plans', verbose_plans=True)
+        output = capsys.readouterr().out
+        assert 'reviews/: ок' in output, (
+            'Проверьте, что команда `check_query_plans` проверяет списки '
+            'отзывов.'
+        )
+        assert 'Все запросы используют индексы.' in output
+
+    def test_02_missing_index_is_reported(self, admin_client, admin,
+                                          capsys):
+        create_comments(admin_client, {admin: admin_client})
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX review_title_date_idx')
+        try:
+            with pytest.raises(CommandError):
+                call_command('check_query_plans')
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'CREATE INDEX review_title_date_idx ON reviews_review '
+                    '(title_id, pub_date, id)'
+                )
+        output = capsys.readouterr().out
+        assert 'reviews/: сортировка без индекса' in output, (
+            'Проверьте, что команда `check_query_plans` сообщает о '
+            'сортировке отзывов без индекса.'
+        )
@@ -0,0 +1,55 @@
+import pytest
+from django.db import connection, connections
+
+from reviews.db import check_health
+
+
+@pytest.fixture
+def file_connection(tmp_path):
+    """Отдельное соединение с файловой базой SQLite."""
+    wrapper = type(connections['default'])(
+        {**connection.settings_dict, 'NAME': str(tmp_path / 'db.sqlite3'),
+         'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+        alias='file',
+    )
+    yield wrapper
+    wrapper.close()
+
+
+def pragma(wrapper, name):
+    with wrapper.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20Database:
+
+    def test_01_sqlite_pragmas(self, file_connection):
+        assert pragma(file_connection, 'journal_mode') == 'wal', (
+            'Проверьте, что соединение с SQLite включает режим WAL.'
+        )
+        assert pragma(file_connection, 'synchronous') == 1, (
+            'Проверьте, что соединение с SQLite задаёт synchronous=NORMAL.'
+        )
+        assert pragma(file_connection, 'busy_timeout') == 5000
+        assert pragma(file_connection, 'mmap_size') > 0
+
+    def test_02_health_check(self, file_connection, monkeypatch):
+        file_connection.ensure_connection()
+        check_health(file_connection)
+        assert file_connection.connection is not None, (
+            'Проверьте, что рабочее соединение не закрывается.'
+        )
+        monkeypatch.setattr(file_connection, 'is_usable', lambda: False)
+        check_health(file_connection)
+        assert file_connection.connection is None, (
+            'Проверьте, что разорванное соединение закрывается перед '
+            'запросом.'
+        )
+
+    def test_03_persistent_connections(self):
+        assert connection.settings_dict['CONN_MAX_AGE'] > 0, (
+            'Проверьте, что соединения с базой переиспользуются '
+            '(`CONN_MAX_AGE`).'
+        )
@@ -0,0 +1,168 @@
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import get_version
+from reviews.db import REPLICA_SETTINGS, ReplicaRouter
+from reviews.models import Category, Comment, DataVersion, Review, User
+from tests.utils import create_single_review, create_titles
+
+CATEGORIES_URL = '/api/v1/categories/'
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """Реплика - отдельный файл SQLite, обновляемый командой sync_replicas."""
+    alias = 'replica'
+    connections.databases[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    monkeypatch.setitem(REPLICA_SETTINGS, 'ALIASES', [alias])
+    yield alias
+    connections[alias].close()
+    del connections[alias]
+    del connections.databases[alias]
+
+
+def slugs(response):
+    return [item['slug'] for item in response.json()['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21Replicas:
+
+    def test_01_reads_go_to_replica(self, replica, client, admin_client):
+        admin_client.post(CATEGORIES_URL, data={'name': 'Фильм',
+                                                'slug': 'films'})
+        call_command('sync_replicas')
+        admin_client.post(CATEGORIES_URL, data={'name': 'Книги',
+                                                'slug': 'books'})
+        response = client.get(CATEGORIES_URL)
+        assert slugs(response) == ['films'], (
+            'Проверьте, что GET-запросы читают данные с реплики.'
+        )
+        assert 'ETag' not in response, (
+            'Проверьте, что ответ реплики сразу после изменения данных не '
+            'получает ETag новой версии.'
+        )
+        call_command('sync_replicas')
+        assert slugs(client.get(CATEGORIES_URL)) == ['books', 'films'], (
+            'Проверьте, что после синхронизации реплика содержит новые '
+            'данные.'
+        )
+
+    def test_02_read_your_writes(self, replica, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        call_command('sync_replicas')
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = create_single_review(admin_client, titles[0]['id'],
+                                        'Отзыв', 7)
+        cookie = response.cookies[REPLICA_SETTINGS['COOKIE']]
+        assert cookie['max-age'] == REPLICA_SETTINGS['STICKY_SECONDS'], (
+            'Проверьте, что после записи клиент на время читает с основной '
+            'базы.'
+        )
+        assert admin_client.get(url).json()['count'] == 1, (
+            'Проверьте, что автор сразу видит свой отзыв, даже если реплика '
+            'ещё не обновлена.'
+        )
+        assert client.get(url).json()['count'] == 0
+        call_command('sync_replicas')
+        assert client.get(url).json()['count'] == 1
+
+    def test_03_primary_outside_requests(self, replica):
+        router = ReplicaRouter()
+        assert router.db_for_read(Category) == 'default', (
+            'Проверьте, что вне запросов к API чтение идёт с основной базы.'
+        )
+        assert router.db_for_write(Category) == 'default'
+        assert not router.allow_migrate(replica, 'reviews')
+
+    def test_04_without_replicas(self, client, admin_client):
+        admin_client.post(CATEGORIES_URL, data={'name': 'Фильм',
+                                                'slug': 'films'})
+        response = client.get(CATEGORIES_URL)
+        assert slugs(response) == ['films'], (
+            'Проверьте, что без реплик все запросы работают с основной базой.'
+        )
+        with pytest.raises(CommandError):
+            call_command('sync_replicas')
+
+    def test_05_settled_replica_is_cached(self, replica, monkeypatch, client,
+                                          admin_client):
+        monkeypatch.setitem(REPLICA_SETTINGS, 'STICKY_SECONDS', 0)
+        admin_client.post(CATEGORIES_URL, data={'name': 'Фильм',
+                                                'slug': 'films'})
+        call_command('sync_replicas')
+        assert 'ETag' in client.get(CATEGORIES_URL)
+        response = client.get(CATEGORIES_URL)
+        assert response['X-Cache'] == 'HIT', (
+            'Проверьте, что ответы реплики, догнавшей основную базу, '
+            'кешируются.'
+        )
+
+    def test_06_lagging_replica_not_cached(self, replica, monkeypatch,
+                                           client, admin_client):
+        monkeypatch.setitem(REPLICA_SETTINGS, 'STICKY_SECONDS', 0)
+        admin_client.post(CATEGORIES_URL, data={'name': 'Фильм',
+                                                'slug': 'films'})
+        call_command('sync_replicas')
+        admin_client.post(CATEGORIES_URL, data={'name': 'Книги',
+                                                'slug': 'books'})
+        response = client.get(CATEGORIES_URL)
+        assert slugs(response) == ['films']
+        assert 'ETag' not in response, (
+            'Проверьте, что ответ реплики, которая ещё не получила новую '
+            'версию данных, не получает ETag, сколько бы времени ни прошло.'
+        )
+        assert client.get(CATEGORIES_URL)['X-Cache'] == 'MISS'
+        call_command('sync_replicas')
+        assert 'ETag' in client.get(CATEGORIES_URL)
+
+    def test_07_sticky_by_token(self, replica, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        call_command('sync_replicas')
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        create_single_review(admin_client, titles[0]['id'], 'Отзыв', 7)
+        admin_client.cookies.clear()
+        assert admin_client.get(url).json()['count'] == 1, (
+            'Проверьте, что клиент без cookie, но с тем же токеном, сразу '
+            'видит свою запись.'
+        )
+        assert client.get(url).json()['count'] == 0
+
+    def test_08_cascade_writes_versions_once(self, replica, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        User.objects.bulk_create(
+            User(username=f'author{index}', email=f'author{index}@yamdb.fake')
+            for index in range(30)
+        )
+        Review.objects.bulk_create(
+            Review(title_id=title_id, author=author, text='Отзыв', score=5)
+            for author in User.objects.filter(username__startswith='author')
+        )
+        Comment.objects.bulk_create(
+            Comment(review=review, author_id=review.author_id, text='Да')
+            for review in Review.objects.filter(title_id=title_id)
+        )
+        version = get_version('reviews', title_id)
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.delete(f'/api/v1/titles/{title_id}/')
+        assert response.status_code == 204
+        writes = [
+            query['sql'] for query in context.captured_queries
+            if 'reviews_dataversion' in query['sql']
+        ]
+        assert len(writes) <= 2, (
+            'Проверьте, что копия версий пишется в базу одной пачкой за '
+            'транзакцию, а не для каждой каскадно удалённой строки.'
+        )
+        assert get_version('reviews', title_id) != version
+        assert DataVersion.objects.filter(
+            version=get_version('reviews', title_id)
+        ).exists(), (
+            'Проверьте, что копия новой версии записана в базу.'
+        )
@@ -0,0 +1,137 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Review, Title
+from tests.utils import create_comments, create_single_comment
+
+TITLES_URL = '/api/v1/titles/'
+
+
+def review_url(title_id, review_id):
+    return f'{TITLES_URL}{title_id}/reviews/{review_id}/'
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22Counters:
+
+    def test_01_counters_follow_api(self, admin_client, admin, user_client,
+                                    user, moderator_client, moderator):
+        comments, reviews, titles = create_comments(admin_client, {
+            admin: admin_client, user: user_client,
+            moderator: moderator_client,
+        })
+        title_id, review_id = titles[0]['id'], reviews[0]['id']
+        title = admin_client.get(f'{TITLES_URL}{title_id}/').json()
+        assert title['reviews_count'] == 3, (
+            'Проверьте, что ответ для произведения содержит поле '
+            '`reviews_count` с числом отзывов.'
+        )
+        review = admin_client.get(review_url(title_id, review_id)).json()
+        assert review['comments_count'] == 3, (
+            'Проверьте, что ответ для отзыва содержит поле `comments_count` '
+            'с числом комментариев.'
+        )
+        admin_client.delete(
+            f'{review_url(title_id, review_id)}comments/{comments[0]["id"]}/'
+        )
+        review = admin_client.get(review_url(title_id, review_id)).json()
+        assert review['comments_count'] == 2, (
+            'Проверьте, что удаление комментария уменьшает `comments_count`.'
+        )
+        admin_client.delete(review_url(title_id, reviews[1]['id']))
+        title = admin_client.get(f'{TITLES_URL}{title_id}/').json()
+        assert title['reviews_count'] == 2
+
+    def test_02_user_deletion(self, admin_client, admin, user_client, user):
+        _, reviews, titles = create_comments(admin_client, {
+            admin: admin_client, user: user_client,
+        })
+        title_id = titles[0]['id']
+        create_single_comment(user_client, title_id, reviews[0]['id'], 'Ещё')
+        admin_client.delete(f'/api/v1/users/{user.username}/')
+        title = Title.objects.get(pk=title_id)
+        assert (title.reviews_count, title.score_sum) == (1, 5), (
+            'Проверьте, что удаление пользователя вычитает его отзывы из '
+            'счётчиков произведений.'
+        )
+        assert Review.objects.get(pk=reviews[0]['id']).comments_count == 1, (
+            'Проверьте, что удаление пользователя вычитает его комментарии '
+            'из счётчиков отзывов.'
+        )
+
+    def test_03_reconcile_command(self, admin_client, admin, capsys):
+        _, reviews, titles = create_comments(admin_client, {
+            admin: admin_client
+        })
+        Title.objects.update(reviews_count=7, score_sum=70)
+        Review.objects.update(comments_count=9)
+        call_command('reconcile_counters')
+        assert 'Исправлено произведений: 2, отзывов: 1.' in (
+            capsys.readouterr().out
+        )
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.reviews_count, title.score_sum) == (1, 5), (
+            'Проверьте, что команда `reconcile_counters` исправляет '
+            'счётчики произведений.'
+        )
+        assert Review.objects.get(pk=reviews[0]['id']).comments_count == 1
+        call_command('reconcile_counters')
+        assert 'Исправлено произведений: 0, отзывов: 0.' in (
+            capsys.readouterr().out
+        ), 'Проверьте, что команда исправляет только разошедшиеся счётчики.'
+
+    def test_04_comment_changes_review_etag(self, admin_client, admin):
+        _, reviews, titles = create_comments(admin_client, {
+            admin: admin_client
+        })
+        title_id, review_id = titles[0]['id'], reviews[0]['id']
+        urls = (f'{TITLES_URL}{title_id}/reviews/',
+                review_url(title_id, review_id))
+        etags = [admin_client.get(url)['ETag'] for url in urls]
+        create_single_comment(admin_client, title_id, review_id, 'Новый')
+        for url, etag in zip(urls, etags):
+            response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.OK, (
+                'Проверьте, что новый комментарий меняет ETag отзывов: '
+                'они содержат `comments_count`.'
+            )
+        assert response.json()['comments_count'] == 2
+        response = admin_client.post('/api/v1/comments/bulk/', data=[
+            {'review': review_id, 'text': 'Пакетный'}
+        ], format='json')
+        comment_id = response.json()[0]['data']['id']
+        assert admin_client.get(urls[1]).json()['comments_count'] == 3, (
+            'Проверьте, что пакетное создание комментариев сбрасывает кеш '
+            'отзывов.'
+        )
+        admin_client.delete('/api/v1/comments/bulk/',
+                            data={'ids': [comment_id]}, format='json')
+        assert admin_client.get(urls[1]).json()['comments_count'] == 2
+
+    def test_05_reconcile_changes_etags(self, admin_client, admin):
+        _, reviews, titles = create_comments(admin_client, {
+            admin: admin_client
+        })
+        title_id = titles[0]['id']
+        urls = (f'{TITLES_URL}{title_id}/', f'{TITLES_URL}{title_id}/reviews/')
+        Title.objects.update(reviews_count=7, score_sum=70)
+        Review.objects.update(comments_count=9)
+        etags = [admin_client.get(url)['ETag'] for url in urls]
+        call_command('reconcile_counters')
+        for url, etag in zip(urls, etags):
+            response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.OK, (
+                'Проверьте, что команда `reconcile_counters` меняет ETag '
+                'ответов с исправленными счётчиками.'
+            )
+        assert response.json()['results'][0]['comments_count'] == 1
+        Title.objects.update(score_sum=70)
+        etag = admin_client.get(urls[0])['ETag']
+        call_command('rebuild_ratings')
+        response = admin_client.get(urls[0], HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что команда `rebuild_ratings` меняет ETag '
+            'произведений.'
+        )
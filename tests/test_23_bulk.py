@@ -0,0 +1,120 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Review, SearchDocument, Title
+from tests.utils import create_single_review, create_titles
+
+REVIEWS_BULK_URL = '/api/v1/reviews/bulk/'
+COMMENTS_BULK_URL = '/api/v1/comments/bulk/'
+
+
+def statuses(response):
+    return [item['status'] for item in response.json()]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23BulkWrite:
+
+    def test_01_bulk_reviews(self, admin_client, user_client,
+                             django_assert_max_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[1]['id'], 'Отзыв', 4)
+        data = [
+            {'title': titles[0]['id'], 'text': 'Первый', 'score': 8},
+            {'title': titles[1]['id'], 'text': 'Второй', 'score': 6},
+            {'title': titles[0]['id'], 'text': 'Повтор', 'score': 1},
+            {'title': 10 ** 6, 'text': 'Нет такого', 'score': 5},
+            {'title': titles[1]['id'], 'text': 'Без оценки'},
+        ]
+        # Проверки и запись не зависят от числа элементов.
+        with django_assert_max_num_queries(15):
+            response = admin_client.post(REVIEWS_BULK_URL, data=data,
+                                         format='json')
+        assert response.status_code == HTTPStatus.MULTI_STATUS, (
+            f'Проверьте, что POST-запрос к `{REVIEWS_BULK_URL}` с ошибками '
+            'в части элементов возвращает статус 207.'
+        )
+        assert statuses(response) == [201, 201, 400, 404, 400], (
+            'Проверьте, что ответ содержит результат для каждого элемента в '
+            'порядке запроса.'
+        )
+        created = response.json()[0]['data']
+        assert created['author'] == 'TestAdmin'
+        assert Review.objects.filter(pk=created['id'], score=8).exists()
+        assert Title.objects.get(pk=titles[1]['id']).reviews_count == 2, (
+            'Проверьте, что пакетное создание обновляет счётчики отзывов.'
+        )
+        assert SearchDocument.objects.filter(
+            kind='review', object_id=created['id']
+        ).exists(), 'Проверьте, что созданные отзывы попадают в поиск.'
+        response = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json()['rating'] == 8
+
+    def test_02_bulk_comments(self, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        review = create_single_review(admin_client, titles[0]['id'],
+                                      'Отзыв', 7).json()
+        data = [
+            {'review': review['id'], 'text': f'Комментарий {idx}'}
+            for idx in range(3)
+        ]
+        response = admin_client.post(COMMENTS_BULK_URL, data=data,
+                                     format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        ids = [item['data']['id'] for item in response.json()]
+        assert len(set(ids)) == 3
+        comments = admin_client.get(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{review["id"]}/'
+            'comments/'
+        ).json()
+        assert [item['id'] for item in comments['results']] == ids, (
+            'Проверьте, что ответ содержит id созданных комментариев.'
+        )
+        assert Review.objects.get(pk=review['id']).comments_count == 3
+
+        response = admin_client.delete(
+            COMMENTS_BULK_URL, data={'ids': ids[:2] + [10 ** 6]},
+            format='json'
+        )
+        assert statuses(response) == [204, 204, 404]
+        assert Review.objects.get(pk=review['id']).comments_count == 1
+
+    def test_03_bulk_delete_permissions(self, admin_client, user_client,
+                                        moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        own = create_single_review(user_client, titles[0]['id'], 'Мой',
+                                   3).json()
+        other = create_single_review(admin_client, titles[0]['id'], 'Чужой',
+                                     9).json()
+        response = user_client.delete(
+            REVIEWS_BULK_URL, data={'ids': [own['id'], other['id']]},
+            format='json'
+        )
+        assert statuses(response) == [204, 403], (
+            'Проверьте, что пользователь может удалить только свои отзывы.'
+        )
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.reviews_count, title.score_sum) == (1, 9)
+        response = moderator_client.delete(
+            REVIEWS_BULK_URL, data={'ids': [other['id']]}, format='json'
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert not Review.objects.exists()
+
+    def test_04_bad_requests(self, client, admin_client):
+        response = client.post(REVIEWS_BULK_URL, data='[]',
+                               content_type='application/json')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что пакетная запись недоступна без авторизации.'
+        )
+        for data in ({}, [], [{}] * 101):
+            response = admin_client.post(REVIEWS_BULK_URL, data=data,
+                                         format='json')
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                'Проверьте, что запрос должен содержать непустой массив не '
+                'больше чем из 100 элементов.'
+            )
+        response = admin_client.delete(COMMENTS_BULK_URL,
+                                       data={'ids': [1, 1]}, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
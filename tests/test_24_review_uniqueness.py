@@ -0,0 +1,67 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import api.bulk
+from reviews.models import Review, Title
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24ReviewUniqueness:
+
+    def test_01_constraint_rejects_duplicate(self, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(url, data={'text': 'Да', 'score': 9})
+        assert response.status_code == HTTPStatus.CREATED
+        prechecks = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "reviews_review"' in query['sql']
+        ]
+        assert not prechecks, (
+            'Проверьте, что перед созданием отзыва нет отдельного запроса '
+            'на проверку уникальности: её выполняет ограничение базы.'
+        )
+        response = admin_client.post(url, data={'text': 'Ещё', 'score': 1})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что повторный отзыв на произведение возвращает 400.'
+        )
+        assert response.json() == {
+            'non_field_errors': [
+                'Пользователь может оставить только один отзыв'
+            ]
+        }
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.reviews_count, title.score_sum) == (1, 9), (
+            'Проверьте, что отклонённый отзыв не меняет рейтинг.'
+        )
+
+    def test_02_bulk_race(self, admin_client, admin, monkeypatch):
+        titles, _, _ = create_titles(admin_client)
+        reviewed_titles = api.bulk.reviewed_titles
+        calls = []
+
+        def stale_check(user, title_ids):
+            # Первая проверка не видит отзыв, записанный параллельно.
+            calls.append(title_ids)
+            if len(calls) == 1:
+                return set()
+            return reviewed_titles(user, title_ids)
+
+        monkeypatch.setattr(api.bulk, 'reviewed_titles', stale_check)
+        Review.objects.create(title_id=titles[0]['id'], author=admin,
+                              text='Параллельный', score=2)
+        response = admin_client.post('/api/v1/reviews/bulk/', data=[
+            {'title': titles[0]['id'], 'text': 'Первый', 'score': 8},
+            {'title': titles[1]['id'], 'text': 'Второй', 'score': 6},
+        ], format='json')
+        assert [item['status'] for item in response.json()] == [400, 201], (
+            'Проверьте, что пакетное создание отклоняет отзывы, отсечённые '
+            'ограничением уникальности, и сохраняет остальные.'
+        )
+        assert Review.objects.filter(author=admin).count() == 2
@@ -0,0 +1,182 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+import api.bulk
+from api.views import ReviewViewSet
+from reviews.models import Review, Title
+from tests.utils import create_single_review, create_titles
+
+TITLES_URL = '/api/v1/titles/'
+
+
+def rating_url(title_id):
+    return f'{TITLES_URL}{title_id}/rating/'
+
+
+def histogram(**counts):
+    return {str(score): counts.get(f's{score}', 0) for score in range(1, 11)}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25RatingHistogram:
+
+    def test_01_histogram_follows_reviews(self, client, admin_client,
+                                          user_client, moderator_client,
+                                          django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        response = client.get(rating_url(title_id))
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{rating_url("{title_id}")}` '
+            'доступен без токена.'
+        )
+        assert response.json() == {
+            'id': title_id, 'rating': None, 'reviews_count': 0,
+            'scores': histogram(),
+        }
+        create_single_review(admin_client, title_id, 'Первый', 8)
+        review = create_single_review(user_client, title_id, 'Второй',
+                                      3).json()
+        create_single_review(moderator_client, title_id, 'Третий', 8)
+        with django_assert_num_queries(1):
+            response = client.get(rating_url(title_id))
+        assert response.json() == {
+            'id': title_id, 'rating': 19 / 3, 'reviews_count': 3,
+            'scores': histogram(s3=1, s8=2),
+        }, (
+            'Проверьте, что распределение оценок и средняя оценка читаются '
+            'из сохранённых счётчиков произведения.'
+        )
+        review_url = f'{TITLES_URL}{title_id}/reviews/{review["id"]}/'
+        user_client.patch(review_url, data={'score': 10})
+        assert client.get(rating_url(title_id)).json()['scores'] == (
+            histogram(s8=2, s10=1)
+        ), 'Проверьте, что изменение оценки переносит отзыв в гистограмме.'
+        user_client.delete(review_url)
+        assert client.get(rating_url(title_id)).json()['scores'] == (
+            histogram(s8=2)
+        ), 'Проверьте, что удаление отзыва уменьшает гистограмму.'
+
+    def test_02_not_modified_and_not_found(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = rating_url(titles[0]['id'])
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        create_single_review(admin_client, titles[0]['id'], 'Отзыв', 5)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что новый отзыв меняет ETag распределения оценок.'
+        )
+        response = client.get(rating_url(10 ** 6))
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_03_bulk_and_user_deletion(self, admin_client, user_client,
+                                       user):
+        titles, _, _ = create_titles(admin_client)
+        response = user_client.post('/api/v1/reviews/bulk/', data=[
+            {'title': titles[0]['id'], 'text': 'Первый', 'score': 4},
+            {'title': titles[1]['id'], 'text': 'Второй', 'score': 9},
+        ], format='json')
+        create_single_review(admin_client, titles[0]['id'], 'Отзыв', 4)
+        assert Title.objects.get(pk=titles[0]['id']).scores[4] == 2, (
+            'Проверьте, что пакетное создание отзывов обновляет гистограмму.'
+        )
+        admin_client.delete('/api/v1/reviews/bulk/', data={
+            'ids': [response.json()[1]['data']['id']]
+        }, format='json')
+        assert Title.objects.get(pk=titles[1]['id']).scores[9] == 0, (
+            'Проверьте, что пакетное удаление отзывов обновляет гистограмму.'
+        )
+        admin_client.delete(f'/api/v1/users/{user.username}/')
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.scores[4], title.reviews_count) == (1, 1), (
+            'Проверьте, что удаление пользователя вычитает его оценки из '
+            'гистограммы.'
+        )
+
+    def test_04_reconcile(self, admin_client, capsys):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(admin_client, titles[0]['id'], 'Отзыв', 6)
+        Title.objects.update(score_6=0, score_2=5)
+        call_command('reconcile_counters')
+        assert 'Исправлено произведений: 2,' in capsys.readouterr().out, (
+            'Проверьте, что `reconcile_counters` сверяет и гистограмму оценок.'
+        )
+        assert Title.objects.get(pk=titles[0]['id']).scores == {
+            score: int(score == 6) for score in range(1, 11)
+        }
+        Review.objects.update(score=7)
+        call_command('rebuild_ratings')
+        assert Title.objects.get(pk=titles[0]['id']).scores[7] == 1
+
+    def test_05_concurrent_update(self, admin_client, monkeypatch):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        review = create_single_review(admin_client, title_id, 'Отзыв',
+                                      5).json()
+        get_object = ReviewViewSet.get_object
+
+        def stale_object(viewset):
+            # Параллельный PATCH меняет оценку после загрузки объекта.
+            instance = get_object(viewset)
+            Review.objects.filter(pk=instance.pk).update(score=8)
+            Title.objects.change_rating(title_id, added=8, removed=5)
+            return instance
+
+        monkeypatch.setattr(ReviewViewSet, 'get_object', stale_object)
+        response = admin_client.patch(
+            f'{TITLES_URL}{title_id}/reviews/{review["id"]}/',
+            data={'score': 3}
+        )
+        assert response.status_code == HTTPStatus.OK
+        title = Title.objects.get(pk=title_id)
+        assert (title.score_sum, title.score_3, title.score_5,
+                title.score_8) == (3, 1, 0, 0), (
+            'Проверьте, что при изменении отзыва из рейтинга вычитается '
+            'оценка, сохранённая в базе, а не загруженная до транзакции.'
+        )
+
+    def test_06_concurrent_delete(self, admin_client, monkeypatch):
+        titles, _, _ = create_titles(admin_client)
+        first, second = titles[0]['id'], titles[1]['id']
+        review = create_single_review(admin_client, first, 'Отзыв',
+                                      5).json()
+        bulk_review = create_single_review(admin_client, second, 'Пакет',
+                                           5).json()
+
+        def concurrent_patch(pk, title_id):
+            Review.objects.filter(pk=pk).update(score=8)
+            Title.objects.change_rating(title_id, added=8, removed=5)
+
+        get_object = ReviewViewSet.get_object
+
+        def stale_object(viewset):
+            instance = get_object(viewset)
+            concurrent_patch(instance.pk, first)
+            return instance
+
+        split_deletable = api.bulk.split_deletable
+
+        def stale_split(user, ids, found):
+            concurrent_patch(bulk_review['id'], second)
+            return split_deletable(user, ids, found)
+
+        monkeypatch.setattr(ReviewViewSet, 'get_object', stale_object)
+        monkeypatch.setattr(api.bulk, 'split_deletable', stale_split)
+        response = admin_client.delete(
+            f'{TITLES_URL}{first}/reviews/{review["id"]}/'
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        response = admin_client.delete('/api/v1/reviews/bulk/', data={
+            'ids': [bulk_review['id']]
+        }, format='json')
+        assert response.status_code == HTTPStatus.OK
+        for title in Title.objects.filter(pk__in=(first, second)):
+            assert (title.reviews_count, title.score_sum, title.score_5,
+                    title.score_8) == (0, 0, 0, 0), (
+                'Проверьте, что при удалении отзыва из рейтинга вычитается '
+                'оценка, сохранённая в базе, а не загруженная до транзакции.'
+            )
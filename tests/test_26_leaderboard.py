@@ -0,0 +1,91 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from api.pagination import KeysetPagination
+from reviews.models import LEADERBOARD_SETTINGS, Title
+from tests.utils import create_single_review, create_titles
+
+LEADERBOARD_URL = '/api/v1/titles/leaderboard/'
+
+
+def names(response):
+    return [item['name'] for item in response.json()['results']]
+
+
+@pytest.fixture
+def ranked(admin_client, user_client, moderator_client):
+    """Одна десятка у первого произведения и три девятки у второго."""
+    titles, _, _ = create_titles(admin_client)
+    create_single_review(admin_client, titles[0]['id'], 'Шедевр', 10)
+    for client in (admin_client, user_client, moderator_client):
+        create_single_review(client, titles[1]['id'], 'Отлично', 9)
+    return titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26Leaderboard:
+
+    def test_01_titles_without_reviews(self, client, admin_client):
+        create_titles(admin_client)
+        response = client.get(LEADERBOARD_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{LEADERBOARD_URL}` доступен без '
+            'токена.'
+        )
+        assert response.json()['results'] == [], (
+            'Проверьте, что в рейтинг не попадают произведения без отзывов.'
+        )
+
+    def test_02_single_review_does_not_dominate(self, client, ranked):
+        response = client.get(LEADERBOARD_URL)
+        assert names(response) == ['Крепкий орешек', 'Терминатор'], (
+            'Проверьте, что произведение с единственной высокой оценкой не '
+            'обгоняет произведение со многими чуть более низкими.'
+        )
+        first, second = response.json()['results']
+        assert first['weighted_rating'] == pytest.approx((27 + 27.5) / 8)
+        assert second['weighted_rating'] == pytest.approx((10 + 27.5) / 6)
+        assert first['rating'] == 9 and first['reviews_count'] == 3
+
+    def test_03_filters_and_cursor(self, client, ranked, monkeypatch):
+        for query, expected in (('category=films', ['Терминатор']),
+                                ('year=1988', ['Крепкий орешек']),
+                                ('genre=comedy', ['Терминатор'])):
+            response = client.get(f'{LEADERBOARD_URL}?{query}')
+            assert names(response) == expected, (
+                'Проверьте, что рейтинг фильтруется по категории, году и '
+                'жанру.'
+            )
+        monkeypatch.setattr(KeysetPagination, 'page_size', 1)
+        response = client.get(f'{LEADERBOARD_URL}?pagination=cursor')
+        assert names(response) == ['Крепкий орешек']
+        response = client.get(response.json()['next'])
+        assert names(response) == ['Терминатор'], (
+            'Проверьте, что курсор рейтинга продолжает порядок по '
+            'взвешенной оценке.'
+        )
+        assert response.json()['next'] is None
+
+    def test_04_incremental_refresh(self, client, admin_client, ranked):
+        assert client.get(LEADERBOARD_URL).status_code == HTTPStatus.OK
+        url = f'/api/v1/titles/{ranked[1]["id"]}/reviews/'
+        for review in admin_client.get(url).json()['results'][:2]:
+            admin_client.delete(f'{url}{review["id"]}/')
+        assert names(client.get(LEADERBOARD_URL)) == [
+            'Терминатор', 'Крепкий орешек'
+        ], (
+            'Проверьте, что рейтинг обновляется при удалении отзывов и не '
+            'отдаёт закешированный порядок.'
+        )
+
+    def test_05_rebuild_after_settings_change(self, ranked, monkeypatch,
+                                              capsys):
+        monkeypatch.setitem(LEADERBOARD_SETTINGS, 'PRIOR_WEIGHT', 0)
+        call_command('reconcile_counters')
+        assert 'Исправлено произведений: 2,' in capsys.readouterr().out, (
+            'Проверьте, что `reconcile_counters` пересчитывает взвешенную '
+            'оценку.'
+        )
+        assert Title.objects.get(pk=ranked[0]['id']).weighted_rating == 10
@@ -0,0 +1,80 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_comments
+
+TITLES_URL = '/api/v1/titles/'
+
+
+def get(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK, response.content
+    return response.json(), [
+        query['sql'] for query in context.captured_queries
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test27SparseFieldsets:
+
+    def test_01_titles(self, client, admin_client, admin):
+        create_comments(admin_client, {admin: admin_client})
+        data, queries = get(client, f'{TITLES_URL}?fields=id,name,rating')
+        assert [set(item) for item in data['results']] == [
+            {'id', 'name', 'rating'}
+        ] * 2, 'Проверьте, что параметр `fields` ограничивает поля ответа.'
+        assert [item['rating'] for item in data['results']] == [None, 5]
+        assert not any('"description"' in sql for sql in queries), (
+            'Проверьте, что невыбранные поля не читаются из базы.'
+        )
+        assert not any('reviews_genre' in sql for sql in queries), (
+            'Проверьте, что жанры не загружаются, если их нет в ответе.'
+        )
+        assert len(queries) == 2, (
+            'Проверьте, что выбранные поля читаются без дозагрузки по '
+            'одному объекту.'
+        )
+        data, queries = get(client, f'{TITLES_URL}?omit=description,genre')
+        assert set(data['results'][0]) == {
+            'id', 'name', 'year', 'rating', 'reviews_count', 'category'
+        }, 'Проверьте, что параметр `omit` убирает поля из ответа.'
+        assert data['results'][0]['category'] is not None
+        title_id = data['results'][0]['id']
+        data, _ = get(client, f'{TITLES_URL}{title_id}/?fields=genre')
+        assert set(data) == {'genre'} and data['genre'], (
+            'Проверьте, что выбор полей работает и для одного объекта.'
+        )
+
+    def test_02_reviews_and_comments(self, client, admin_client, admin):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client}
+        )
+        url = f'{TITLES_URL}{titles[0]["id"]}/reviews/'
+        data, queries = get(client, f'{url}?fields=id,score')
+        assert data['results'] == [
+            {'id': reviews[0]['id'], 'score': 5}
+        ]
+        assert not any('reviews_user' in sql for sql in queries), (
+            'Проверьте, что авторы не загружаются, если их нет в ответе.'
+        )
+        data, queries = get(client, f'{url}{reviews[0]["id"]}/comments/'
+                                    '?fields=author&pagination=cursor')
+        assert data['results'] == [{'author': admin.username}]
+        assert not any('"email"' in sql for sql in queries), (
+            'Проверьте, что у автора читается только имя пользователя.'
+        )
+        data, _ = get(client, f'{TITLES_URL}leaderboard/'
+                              '?fields=name,weighted_rating&pagination=cursor')
+        assert set(data['results'][0]) == {'name', 'weighted_rating'}
+
+    def test_03_unknown_fields(self, client, admin_client):
+        for query in ('fields=id,secret', 'omit=secret'):
+            response = client.get(f'{TITLES_URL}?{query}')
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                'Проверьте, что неизвестное поле в `fields` или `omit` '
+                'возвращает ошибку 400.'
+            )
@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+from reviews.models import OutgoingEmail
+from reviews.outbox import OUTBOX_SETTINGS, send_batch
+
+
+def queue_email():
+    return OutgoingEmail.objects.create(
+        subject='Код', body='12345', from_email='admin@yamdb.fake',
+        recipient='user@yamdb.fake'
+    )
+
+
+def refuse_connection(self):
+    raise ConnectionRefusedError('Сервер недоступен')
+
+
+@pytest.mark.django_db(transaction=True)
+class Test28Outbox:
+
+    def test_01_connection_failure(self, monkeypatch):
+        message = queue_email()
+        outbox_before = len(mail.outbox)
+        monkeypatch.setattr(EmailBackend, 'open', refuse_connection)
+        call_command('send_outbox', once=True)
+        message.refresh_from_db()
+        assert message.sent_at is None
+        assert message.attempts == 1, (
+            'Проверьте, что недоступный почтовый сервер не роняет воркер и '
+            'засчитывает письму ровно одну попытку за проход.'
+        )
+        assert 'Сервер недоступен' in message.last_error
+        assert message.next_attempt_at > timezone.now(), (
+            'Проверьте, что после ошибки соединения повтор отложен.'
+        )
+        assert len(mail.outbox) == outbox_before
+
+    def test_02_retry_backoff(self, monkeypatch):
+        message = queue_email()
+        monkeypatch.setattr(EmailBackend, 'open', refuse_connection)
+        assert send_batch() == (0, 1)
+        assert send_batch() == (0, 0), (
+            'Проверьте, что письмо не выбирается повторно до '
+            '`next_attempt_at`.'
+        )
+        message.refresh_from_db()
+        first_delay = message.next_attempt_at - timezone.now()
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        assert send_batch() == (0, 1)
+        message.refresh_from_db()
+        assert message.attempts == 2
+        assert message.next_attempt_at - timezone.now() > first_delay, (
+            'Проверьте, что пауза перед повтором растёт с каждой попыткой.'
+        )
+        monkeypatch.undo()
+        OutgoingEmail.objects.update(
+            next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+        assert send_batch() == (1, 0), (
+            'Проверьте, что письмо отправляется, когда подошло время повтора.'
+        )
+        message.refresh_from_db()
+        assert message.sent_at is not None
+        assert message.next_attempt_at is None
+        assert message.last_error == ''
+
+    def test_03_attempts_limit(self, monkeypatch):
+        message = queue_email()
+        monkeypatch.setattr(EmailBackend, 'open', refuse_connection)
+        for _ in range(OUTBOX_SETTINGS['MAX_ATTEMPTS']):
+            OutgoingEmail.objects.update(next_attempt_at=None)
+            send_batch()
+        OutgoingEmail.objects.update(next_attempt_at=None)
+        assert send_batch() == (0, 0), (
+            'Проверьте, что после MAX_ATTEMPTS попыток письмо больше не '
+            'отправляется.'
+        )
+        message.refresh_from_db()
+        assert message.attempts == OUTBOX_SETTINGS['MAX_ATTEMPTS']